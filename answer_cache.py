@@ -0,0 +1,112 @@
+"""
+answer_cache.py — Reuse LLM answers for repeated questions about the same code.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+ANSWER_CACHE_SIZE = int(os.environ.get("REPOROVER_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.environ.get("REPOROVER_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_DIR = os.environ.get("REPOROVER_ANSWER_CACHE_DIR")  # unset = memory only
+
+
+def normalize_question(question: str) -> str:
+    """Case, spacing and trailing punctuation don't change what is being asked."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+def answer_key(commit, question: str, context: str, model: str = "") -> str:
+    context_hash = hashlib.sha256(context.encode("utf8")).hexdigest()
+    raw = "\0".join((commit or "", normalize_question(question), context_hash, model))
+    return hashlib.sha256(raw.encode("utf8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    In-memory LRU of answer result dicts with a time-to-live, optionally
+    backed by a directory of JSON files that survives restarts and is
+    shared between processes.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 directory=ANSWER_CACHE_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory else None
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    return dict(entry[1])
+                del self._entries[key]
+
+        if self.directory is None:
+            return None
+        path = self.directory / f"{key}.json"
+        try:
+            stored = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if now - stored["stored_at"] > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        self._remember(key, stored["stored_at"], stored["result"])
+        return dict(stored["result"])
+
+    def put(self, key: str, result: dict):
+        stored_at = time.time()
+        self._remember(key, stored_at, result)
+        if self.directory is None:
+            return
+        tmp = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": stored_at, "result": result}, f)
+            os.replace(tmp, self.directory / f"{key}.json")
+        except (OSError, TypeError, ValueError):
+            # The disk tier is best effort
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+
+    def _remember(self, key, stored_at, result):
+        with self._lock:
+            self._entries[key] = (stored_at, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory is not None:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_answer_cache():
+    """Shared cache for the app; None when disabled via REPOROVER_ANSWER_CACHE=0."""
+    global _default_cache
+    if os.environ.get("REPOROVER_ANSWER_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
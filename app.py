@@ -1,6 +1,10 @@
+import time
+
 import streamlit as st
-from repo_loader import clone_and_build_graph
-from llm_engine import answer_question
+from graph_registry import get_default_registry
+from load_jobs import CANCELLED, DONE, PROGRESS_HZ, get_default_job_manager
+from llm_engine import stream_answer
+from prefetch import PREFETCH_ENABLED, SUGGESTED_QUESTIONS, get_default_prefetcher
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -255,12 +259,23 @@ st.markdown("""
 # ── Session state init ─────────────────────────────────────────────────────────
 if "graph" not in st.session_state:
     st.session_state.graph = None
+if "graph_handle" not in st.session_state:
+    # Reference to the graph shared with other sessions on the same repo + commit
+    st.session_state.graph_handle = None
 if "repo_info" not in st.session_state:
     st.session_state.repo_info = None
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "loading_logs" not in st.session_state:
     st.session_state.loading_logs = []
+if "last_answer" not in st.session_state:
+    st.session_state.last_answer = None
+if "load_job" not in st.session_state:
+    # Background load in progress (see load_jobs.py), polled on each rerun
+    st.session_state.load_job = None
+if "prefetch" not in st.session_state:
+    # Answers to the suggested questions being generated ahead (see prefetch.py)
+    st.session_state.prefetch = None
 
 
 # ── Sidebar ────────────────────────────────────────────────────────────────────
@@ -281,7 +296,8 @@ with st.sidebar:
     st.markdown('<p class="sidebar-label" style="margin-top:1rem">GitHub Repo URL</p>', unsafe_allow_html=True)
     repo_url = st.text_input(
         "", placeholder="https://github.com/user/repo",
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        help="A .../tree/<branch>/<folder> URL loads that branch, tag or commit and indexes only that folder"
     )
 
     load_btn = st.button("🚀 Load Repository", use_container_width=True)
@@ -300,18 +316,14 @@ with st.sidebar:
 
         st.markdown("---")
         st.markdown('<p class="sidebar-label">Try asking</p>', unsafe_allow_html=True)
-        suggestions = [
-            "What does this repo do?",
-            "What are the main classes?",
-            "List all functions",
-            "Where is the main entry point?",
-            "What file types are in this repo?",
-        ]
-        for s in suggestions:
-            if st.button(s, key=f"sug_{s}", use_container_width=True):
+        prefetch = st.session_state.prefetch
+        for s in SUGGESTED_QUESTIONS:
+            label = f"⚡ {s}" if prefetch is not None and prefetch.ready(s) else s
+            if st.button(label, key=f"sug_{s}", use_container_width=True):
                 st.session_state["suggested_q"] = s
 
     st.markdown("---")
+    show_debug = st.checkbox("Show debug panel", help="Stage timings and counters of the last load and answer")
     st.markdown(
         '<p style="font-size:0.7rem; color:#4b5563;">Powered by Groq · LangChain · Tree-sitter · NetworkX</p>',
         unsafe_allow_html=True
@@ -335,32 +347,60 @@ if load_btn:
     elif not repo_url:
         st.error("Please enter a GitHub repository URL.")
     else:
+        if st.session_state.load_job is not None:
+            st.session_state.load_job.cancel()
+        if st.session_state.prefetch is not None:
+            st.session_state.prefetch.close()
+            st.session_state.prefetch = None
+        if st.session_state.graph_handle is not None:
+            st.session_state.graph_handle.release()
+            st.session_state.graph_handle = None
         st.session_state.graph = None
         st.session_state.repo_info = None
         st.session_state.messages = []
         st.session_state.loading_logs = []
+        st.session_state.last_answer = None
+        st.session_state.load_job = get_default_job_manager().submit(repo_url)
 
-        logs_placeholder = st.empty()
-        status_lines = []
 
-        def on_progress(msg):
-            status_lines.append(msg)
-            logs_placeholder.markdown(
-                "\n".join(f'<div class="status-box">{l}</div>' for l in status_lines[-6:]),
-                unsafe_allow_html=True
-            )
+# ── Load job polling ───────────────────────────────────────────────────────────
+job = st.session_state.load_job
+if job is not None and job.active:
+    status = job.snapshot()
+    st.markdown(
+        "\n".join(f'<div class="status-box">{l}</div>' for l in status["messages"]),
+        unsafe_allow_html=True
+    )
+    if job.graph is not None:
+        # Questions already work against the files indexed so far
+        st.session_state.graph = job.graph
+        st.progress(job.graph.indexed_fraction,
+                    text=f"{job.graph.indexed_fraction:.0%} indexed · ask away, answers improve as indexing continues")
+    st.caption(f"⏱️ {status['elapsed']:.0f}s")
+    if st.button("✖ Cancel loading"):
+        job.cancel()
+elif job is not None:
+    st.session_state.load_job = None
+    st.session_state.graph = None
+    st.session_state.loading_logs = job.messages
+    if job.state == DONE:
+        info = job.handle.info
+        st.session_state.graph_handle = job.handle
+        st.session_state.graph = job.handle.graph
+        st.session_state.repo_info = info
+        if PREFETCH_ENABLED and groq_key:
+            st.session_state.prefetch = get_default_prefetcher().start(job.handle.graph, groq_key)
+        st.session_state.load_notice = (f"✅ Loaded **{info['parsed_files']}** files · **{info['functions']}** functions · "
+                                        f"**{info['classes']}** classes. Ready to chat!")
+        st.rerun()
+    elif job.state == CANCELLED:
+        st.info("Loading cancelled.")
+    else:
+        st.error(f"❌ {job.error}")
 
-        try:
-            graph, info = clone_and_build_graph(repo_url, progress_callback=on_progress)
-            st.session_state.graph = graph
-            st.session_state.repo_info = info
-            st.session_state.loading_logs = status_lines
-            logs_placeholder.empty()
-            st.success(f"✅ Loaded **{info['parsed_files']}** files · **{info['functions']}** functions · **{info['classes']}** classes. Ready to chat!")
-            st.rerun()
-        except Exception as e:
-            logs_placeholder.empty()
-            st.error(f"❌ {e}")
+notice = st.session_state.pop("load_notice", None)
+if notice:
+    st.success(notice)
 
 
 # ── Stats bar (when repo loaded) ───────────────────────────────────────────────
@@ -428,22 +468,77 @@ else:
           {question}
         </div>""", unsafe_allow_html=True)
 
-        with st.spinner("🛰️ Analyzing..."):
-            try:
-                result = answer_question(question, st.session_state.graph, groq_key)
-                answer = result["answer"]
-            except Exception as e:
-                answer = f"⚠️ Error: {e}"
+        answer_placeholder = st.empty()
+
+        def render_answer(text):
+            answer_placeholder.markdown(f"""
+            <div class="chat-assistant">
+              <div class="chat-label">🛰️ RepoRover</div>
+              {text}
+            </div>""", unsafe_allow_html=True)
+
+        answer = ""
+        try:
+            with st.spinner("🛰️ Analyzing..."):
+                if suggested and st.session_state.prefetch is not None:
+                    st.session_state.prefetch.claim(suggested)
+                stream = stream_answer(question, st.session_state.graph, groq_key)
+            for chunk in stream:
+                answer += chunk
+                render_answer(answer + " ▌")
+            st.session_state.last_answer = stream.result
+            if stream.result["indexed_fraction"] < 1.0:
+                answer += (f"<br><br>⏳ Answered from {stream.result['indexed_fraction']:.0%} of the repository "
+                           "while indexing was still running.")
+        except Exception as e:
+            answer = f"⚠️ Error: {e}"
 
         st.session_state.messages.append({"role": "assistant", "content": answer})
-        st.markdown(f"""
-        <div class="chat-assistant">
-          <div class="chat-label">🛰️ RepoRover</div>
-          {answer}
-        </div>""", unsafe_allow_html=True)
+        render_answer(answer)
 
     # Clear chat button
     if st.session_state.messages:
         if st.button("🗑️ Clear Chat"):
             st.session_state.messages = []
             st.rerun()
+
+
+# ── Debug panel ────────────────────────────────────────────────────────────────
+def _telemetry_table(result):
+    rows = [{"metric": f"{name} (ms)", "value": round(seconds * 1000, 1)}
+            for name, seconds in result.get("timings", {}).items()]
+    rows += [{"metric": name, "value": value} for name, value in result.get("counters", {}).items()]
+    return rows
+
+
+if show_debug:
+    with st.expander("🔧 Debug", expanded=True):
+        load_col, answer_col = st.columns(2)
+        with load_col:
+            st.markdown('<p class="sidebar-label">Last load</p>', unsafe_allow_html=True)
+            if st.session_state.repo_info:
+                st.caption(f"cache hit: {st.session_state.repo_info.get('cache_hit', False)}")
+                st.dataframe(_telemetry_table(st.session_state.repo_info), hide_index=True, use_container_width=True)
+        with answer_col:
+            st.markdown('<p class="sidebar-label">Last answer</p>', unsafe_allow_html=True)
+            last = st.session_state.last_answer
+            if last:
+                st.caption(f"cache: {last.get('cache')} · context: {last.get('context_tokens')}/{last.get('token_budget')} tokens")
+                st.dataframe(_telemetry_table(last), hide_index=True, use_container_width=True)
+        registry = get_default_registry().stats()
+        st.caption(f"Shared graphs: {registry['graphs']} · ~{registry['bytes'] / 2**20:.0f} / "
+                   f"{registry['max_bytes'] / 2**20:.0f} MB · {registry['references']} session references")
+        if PREFETCH_ENABLED:
+            prefetched = get_default_prefetcher().stats()
+            st.caption(f"Prefetched answers: {prefetched['prefetched']} · clicked {prefetched['clicked']} · "
+                       f"never clicked {prefetched['unclicked']}")
+            if prefetched["unclicked_by_question"]:
+                st.dataframe([{"question": q, "never clicked": n}
+                              for q, n in prefetched["unclicked_by_question"].items()],
+                             hide_index=True, use_container_width=True)
+
+
+# ── Keep polling a running load ────────────────────────────────────────────────
+if st.session_state.load_job is not None and st.session_state.load_job.active:
+    time.sleep(1 / PROGRESS_HZ)
+    st.rerun()
@@ -0,0 +1,86 @@
+"""
+bench_backends.py — Memory and query latency of the networkx and compact
+CodeGraph backends on a synthetic graph (default 200k entities), built
+through parse_file() so nodes and references have their real shape.
+
+Run from the repo root:  python benchmarks/bench_backends.py [--entities 200000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from graph_engine import CodeGraph  # noqa: E402
+from step1_parser import parse_file  # noqa: E402
+
+PER_FILE = 500
+
+
+def make_module(n: int) -> str:
+    out = ["import os", "from pkg0.module_0 import build_0", ""]
+    for i in range(n // 5):
+        out.append(f"class Service{i}:")
+        for m in range(3):
+            out.append(f"    def handle_{m}_{i}(self, request):\n"
+                       f"        return self.handle_{(m + 1) % 3}_{i}(os.path.join(request))\n")
+        out.append(f"def build_{i}(config):\n    return Service{i}(build_0(config))\n")
+    return "\n".join(out)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def run(backend: str, entities: int) -> dict:
+    source = make_module(PER_FILE)
+    parsed = parse_file(source.encode("utf8"))
+    n_files = max(1, entities // len(parsed.spans))
+
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    graph = CodeGraph(backend)
+    for f in range(n_files):
+        graph.add_file(f"pkg{f % 50}/module_{f}.py", source, parsed=parsed)
+    build_s = time.perf_counter() - t0
+    gc.collect()
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    files = graph.get_all_files()
+    return {
+        "backend": backend,
+        "entities": graph.get_stats()["total_entities"],
+        "build_s": build_s,
+        "memory_mb": memory_mb,
+        "get_stats_ms": timed(graph.get_stats),
+        "search_rare_ms": timed(lambda: graph.search_by_name("build_42")),
+        "entities_in_file_ms": timed(lambda: [graph.get_entities_in_file(f) for f in files[:100]]) / 100,
+        "get_classes_ms": timed(graph.get_classes, repeat=2),
+        "to_networkx_s": timed(lambda: graph.graph, repeat=1) / 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--entities", type=int, default=200_000)
+    args = ap.parse_args()
+
+    rows = [run(b, args.entities) for b in ("networkx", "compact")]
+    keys = [k for k in rows[0] if k != "backend"]
+    print(f"{'':22s}" + "".join(f"{r['backend']:>12s}" for r in rows))
+    for k in keys:
+        print(f"{k:22s}" + "".join(f"{r[k]:12.3f}" if isinstance(r[k], float) else f"{r[k]:12d}" for r in rows))
+
+
+if __name__ == "__main__":
+    main()
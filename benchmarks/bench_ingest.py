@@ -0,0 +1,185 @@
+"""
+bench_ingest.py — End-to-end ingestion benchmark on synthetic git repos.
+
+Each case builds a repo with synth_repo.make_repo, then loads it through
+clone_and_build_graph from its file:// URL in a fresh subprocess (so peak
+RSS is that load's alone) and reports wall time, peak RSS, per-stage
+timings, CodeGraph query latency and context-building latency. Results are
+written as JSON tagged with the current git commit; compare two runs with
+--compare.
+
+Run from the repo root:
+    python benchmarks/bench_ingest.py [--files 200 2000] [--workers 1]
+    python benchmarks/bench_ingest.py --compare old.json new.json
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+QUESTIONS = ("how are user sessions cached", "where is the order parser",
+             "what does the stream worker return", "explain the config index")
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def measure(url: str, workers) -> dict:
+    """Load `url` once and time the query helpers; runs inside the child process."""
+    from context_builder import build_ranked_context, build_repo_map
+    from repo_loader import clone_and_build_graph
+    from retrieval import rank_entities
+
+    t0 = time.perf_counter()
+    graph, info = clone_and_build_graph(url, workers=workers, use_cache=False)
+    wall_s = time.perf_counter() - t0
+    # The loader builds the BM25 index before returning
+    bm25_build_s = info["timings"].get("index", 0.0)
+
+    files = graph.get_all_files()
+    queries = {
+        "get_stats_ms": timed(graph.get_stats),
+        "search_by_name_ms": timed(lambda: graph.search_by_name("session")),
+        "entities_in_file_ms": timed(lambda: [graph.get_entities_in_file(f) for f in files[:100]])
+        / max(1, min(100, len(files))),
+        "get_functions_ms": timed(graph.get_functions, repeat=2),
+        "get_classes_ms": timed(graph.get_classes, repeat=2),
+        "rank_entities_ms": timed(lambda: [rank_entities(graph, q, k=8) for q in QUESTIONS]) / len(QUESTIONS),
+        "ranked_context_ms": timed(lambda: [build_ranked_context(graph, rank_entities(graph, q, k=8))
+                                            for q in QUESTIONS]) / len(QUESTIONS),
+        "repo_map_ms": timed(lambda: build_repo_map(graph, preview_lines=10), repeat=2),
+    }
+    return {
+        "wall_s": wall_s,
+        "peak_rss_mb": _peak_rss_mb(),
+        # Largest single child: a parse worker or the git clone
+        "child_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "timings": info["timings"],
+        "counters": info["counters"],
+        "bm25_build_s": bm25_build_s,
+        "queries": queries,
+        "total_files": info["total_files"],
+        "parsed_files": info["parsed_files"],
+        "total_entities": info["total_entities"],
+    }
+
+
+def run_case(files: int, args) -> dict:
+    from synth_repo import make_repo
+
+    with tempfile.TemporaryDirectory(prefix="reporover_bench_") as tmp:
+        url = make_repo(Path(tmp) / "repo", files=files, py_ratio=args.py_ratio,
+                        file_lines=args.file_lines, depth=args.depth, seed=args.seed)
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", url, "--workers", str(args.workers)],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        )
+    result = json.loads(child.stdout.splitlines()[-1])
+    result["case"] = {"files": files, "py_ratio": args.py_ratio, "file_lines": args.file_lines,
+                      "depth": args.depth, "seed": args.seed, "workers": args.workers}
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _flatten(result: dict) -> dict:
+    row = {"wall_s": result["wall_s"], "peak_rss_mb": result["peak_rss_mb"],
+           "child_peak_rss_mb": result["child_peak_rss_mb"], "bm25_build_s": result["bm25_build_s"]}
+    row.update({f"{k}_s": v for k, v in result["timings"].items()})
+    row.update(result["queries"])
+    return row
+
+
+def print_table(results: list[dict]):
+    rows = [_flatten(r) for r in results]
+    print(f"{'files':22s}" + "".join(f"{r['case']['files']:>12d}" for r in results))
+    print(f"{'entities':22s}" + "".join(f"{r['total_entities']:>12d}" for r in results))
+    for k in rows[0]:
+        print(f"{k:22s}" + "".join(f"{row[k]:12.3f}" for row in rows))
+
+
+def compare(old_path: str, new_path: str):
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old['commit']} -> {new['commit']}")
+    old_cases = {r["case"]["files"]: r for r in old["results"]}
+    for result in new["results"]:
+        files = result["case"]["files"]
+        if files not in old_cases:
+            continue
+        print(f"\nfiles={files}")
+        before, after = _flatten(old_cases[files]), _flatten(result)
+        for k, v in after.items():
+            if k in before:
+                change = (v / before[k] - 1) * 100 if before[k] else 0.0
+                print(f"  {k:22s}{before[k]:12.3f}{v:12.3f}{change:+10.1f}%")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--files", type=int, nargs="+", default=[200, 2000])
+    ap.add_argument("--py-ratio", type=float, default=0.7)
+    ap.add_argument("--file-lines", type=int, default=120)
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", default="1", help='worker processes, or "auto"')
+    ap.add_argument("--output", help="results file (default benchmarks/results/ingest-<commit>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.child:
+        workers = None if args.workers == "auto" else int(args.workers)
+        print(json.dumps(measure(args.child, workers)))
+        return
+
+    commit = _git_commit()
+    results = [run_case(n, args) for n in args.files]
+    print_table(results)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"ingest-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }, indent=2))
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+bench_parser.py — Compare the legacy per-node re-encoding parser with the
+single-encode span parser on large generated Python files.
+
+Run from the repo root:  python benchmarks/bench_parser.py [--lines 10000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from step1_parser import get_parser, parse_spans  # noqa: E402
+
+
+def make_source(lines: int) -> str:
+    """Generate roughly `lines` lines of Python with classes, methods and functions."""
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.append(f"class Model{i}:")
+        out.append(f'    """Generated model {i}."""')
+        for m in range(4):
+            out.append(f"    def method_{m}(self, value):")
+            out.append(f"        total = value * {m} + {i}")
+            out.append("        return total")
+            out.append("")
+        out.append(f"def helper_{i}(a, b):")
+        out.append("    def inner(x):")
+        out.append("        return x + 1")
+        out.append("    return inner(a) + b")
+        out.append("")
+        i += 1
+    return "\n".join(out[:lines]) + "\n"
+
+
+def legacy_chunks(code_source: str):
+    """The pre-span implementation: re-encodes the whole file per node."""
+    tree = get_parser().parse(bytes(code_source, "utf8"))
+    chunks = []
+    cursor = tree.walk()
+    while True:
+        node = cursor.node
+        if node.type in ["function_definition", "class_definition"]:
+            text = code_source.encode("utf8")[node.start_byte:node.end_byte].decode("utf8")
+            name = "unknown"
+            for child in node.children:
+                if child.type == "identifier":
+                    name = code_source.encode("utf8")[child.start_byte:child.end_byte].decode("utf8")
+                    break
+            chunks.append((name, node.type, text))
+        if cursor.goto_first_child():
+            continue
+        if cursor.goto_next_sibling():
+            continue
+        while True:
+            if not cursor.goto_parent():
+                return chunks
+            if cursor.goto_next_sibling():
+                break
+
+
+def span_chunks(code_source: str):
+    data = code_source.encode("utf8")
+    view = memoryview(data)
+    return [(s.name, s.kind, str(view[s.start_byte:s.end_byte], "utf8")) for s in parse_spans(data)]
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--lines", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    source = make_source(args.lines)
+    legacy_t, legacy = best_of(legacy_chunks, source, args.repeat)
+    span_t, spans = best_of(span_chunks, source, args.repeat)
+    assert legacy == spans, "span parser output differs from legacy parser"
+
+    print(f"{args.lines} lines, {len(spans)} entities, {len(source) / 1024:.0f} KiB")
+    print(f"  legacy : {legacy_t * 1000:8.1f} ms")
+    print(f"  spans  : {span_t * 1000:8.1f} ms")
+    print(f"  speedup: {legacy_t / span_t:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
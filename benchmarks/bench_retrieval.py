@@ -0,0 +1,102 @@
+"""
+bench_retrieval.py — Offline relevance and speed check for BM25 retrieval.
+
+Indexes RepoRover's own source, asks questions whose answer lives in a known
+entity, and compares BM25 ranking with the old "first long word that matches
+a name" lookup. Then times index build and queries on an enlarged copy.
+
+Run from the repo root:  python benchmarks/bench_retrieval.py [--copies 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from graph_engine import CodeGraph  # noqa: E402
+from retrieval import BM25Index  # noqa: E402
+
+# (question, name of the entity that answers it)
+QUESTIONS = [
+    ("How are files parsed into function and class spans?", "parse_spans"),
+    ("Where do we tokenize identifiers by camelCase and snake_case?", "tokenize"),
+    ("How is the graph cache evicted when it gets too large?", "evict"),
+    ("How does the incremental update use the git diff?", "update_graph"),
+    ("Which function removes a file from the graph?", "remove_file"),
+    ("How is a graph serialized to bytes?", "to_bytes"),
+    ("How are parse workers batched in the process pool?", "_iter_parsed"),
+    ("How does search by name use trigrams?", "search_by_name"),
+    ("What resolves the remote HEAD commit?", "_resolve_head"),
+    ("How are stats like number of functions and classes computed?", "get_stats"),
+]
+
+
+def source_files():
+    return sorted(p for p in ROOT.glob("*.py") if p.is_file())
+
+
+def build_graph(copies: int = 1) -> CodeGraph:
+    graph = CodeGraph()
+    files = source_files()
+    for c in range(copies):
+        prefix = f"copy{c}/" if copies > 1 else ""
+        for p in files:
+            graph.add_file(prefix + p.name, p.read_text(encoding="utf-8"))
+    return graph
+
+
+def legacy_rank(graph: CodeGraph, question: str) -> list[str]:
+    for word in (w for w in question.split() if len(w) > 3):
+        results = graph.search_by_name(word)
+        if results:
+            return [r["name"] for r in results]
+    return []
+
+
+def bm25_rank(graph: CodeGraph, index: BM25Index, question: str, k: int) -> list[str]:
+    return [graph.get_node(node_id)["name"] for node_id, _ in index.search(question, k)]
+
+
+def score(rankings, k):
+    hits = 0
+    rr = 0.0
+    for expected, ranked in rankings:
+        ranked = ranked[:k]
+        if expected in ranked:
+            hits += 1
+            rr += 1 / (ranked.index(expected) + 1)
+    return hits / len(rankings), rr / len(rankings)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--copies", type=int, default=200, help="repo copies for the speed test")
+    args = ap.parse_args()
+
+    graph = build_graph()
+    index = BM25Index(graph)
+    legacy = [(exp, legacy_rank(graph, q)) for q, exp in QUESTIONS]
+    ranked = [(exp, bm25_rank(graph, index, q, args.k)) for q, exp in QUESTIONS]
+
+    print(f"relevance over {len(QUESTIONS)} questions, {graph.get_stats()['total_entities']} entities")
+    for label, rankings in (("name match", legacy), ("bm25", ranked)):
+        recall, mrr = score(rankings, args.k)
+        print(f"  {label:10s} recall@{args.k}={recall:.2f}  MRR={mrr:.2f}")
+
+    big = build_graph(args.copies)
+    t0 = time.perf_counter()
+    index = BM25Index(big)
+    build_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for q, _ in QUESTIONS:
+        index.search(q, args.k)
+    query_ms = (time.perf_counter() - t0) * 1000 / len(QUESTIONS)
+    print(f"speed on {big.get_stats()['total_entities']} entities: "
+          f"build {build_s:.2f} s, query {query_ms:.2f} ms avg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+check_cache.py — The graph cache must hit, miss and invalidate correctly.
+
+Builds a synthetic repo and loads it through clone_and_build_graph with a
+GraphCache in a temporary directory, checking that: the first load is a
+miss and the second a hit with the same graph, already linked and with
+its search index restored; a new commit misses; an
+entry written under another format version or Python version (the
+version stamp) is discarded and deleted, as is a truncated one; and
+use_cache=False neither reads nor writes. Exits non-zero on any failure.
+
+Run from the repo root:
+    python benchmarks/check_cache.py [--files 100]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import graph_cache  # noqa: E402
+from graph_cache import GraphCache  # noqa: E402
+from repo_loader import clone_and_build_graph  # noqa: E402
+from retrieval import get_index  # noqa: E402
+from synth_repo import make_repo  # noqa: E402
+
+failures = []
+
+
+def check(condition: bool, what: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {what}")
+    if not condition:
+        failures.append(what)
+
+
+def snapshot(graph) -> tuple:
+    return sorted(graph.get_all_files()), sorted(graph.get_entity_ids()), sorted(graph._store.edges())
+
+
+def load(url: str, cache: GraphCache, **kwargs):
+    return clone_and_build_graph(url, use_cache=kwargs.pop("use_cache", True), cache=cache,
+                                 parse_cache=None, **kwargs)
+
+
+def entries(cache: GraphCache) -> list:
+    return sorted(cache.directory.glob("*.rrg"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--files", type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="reporover_check_cache_") as tmp:
+        repo = Path(tmp) / "repo"
+        url = make_repo(repo, files=args.files, py_ratio=0.7, file_lines=60, depth=2, seed=0)
+        cache = GraphCache(Path(tmp) / "cache")
+
+        graph, info = load(url, cache)
+        check(not info["cache_hit"], "first load misses")
+        check(len(entries(cache)) == 1, "first load writes one entry")
+        cached, info = load(url, cache)
+        check(info["cache_hit"], "second load hits")
+        check(snapshot(cached) == snapshot(graph), "cached graph matches the built one")
+        check(cached.commit == graph.commit, "cached graph keeps its commit")
+        check(cached._linked_version == cached.version, "cached graph comes back linked")
+        index = get_index(cached)
+        check(index.search("parse config request", 10) == get_index(graph).search("parse config request", 10),
+              "cached search index ranks like the built one")
+
+        (repo / "added.py").write_text("def added():\n    return 1\n")
+        git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+        subprocess.run(git + ["add", "-A"], cwd=repo, check=True)
+        subprocess.run(git + ["commit", "-q", "-m", "more"], cwd=repo, check=True)
+        updated, info = load(url, cache)
+        check(not info["cache_hit"], "a new commit misses")
+        check("added.py" in updated.get_all_files(), "the new commit's files are loaded")
+        check(len(entries(cache)) == 2, "each commit has its own entry")
+
+        # Entries written by another format version or Python are dropped
+        stamp = (graph_cache.GRAPH_FORMAT_VERSION + 1, *graph_cache._STAMP[1:])
+        with mock.patch.object(graph_cache, "_STAMP", stamp):
+            check(cache.get(repo.as_uri(), updated.commit) is None, "a different version stamp misses")
+        check(len(entries(cache)) == 1, "the stale entry is deleted")
+        _, info = load(url, cache)
+        check(not info["cache_hit"], "a load after the stale entry rebuilds")
+
+        path = cache._path(repo.as_uri(), updated.commit)
+        path.write_bytes(path.read_bytes()[:40])
+        check(cache.get(repo.as_uri(), updated.commit) is None, "a truncated entry misses")
+        check(not path.exists(), "the truncated entry is deleted")
+
+        before = entries(cache)
+        _, info = load(url, cache, use_cache=False)
+        check(not info["cache_hit"] and entries(cache) == before, "use_cache=False neither reads nor writes")
+
+    print("OK" if not failures else f"FAILED: {len(failures)} checks")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+check_repo_urls.py — /tree/<ref>/<path> URLs must resolve and load the
+right commit and subtree.
+
+Builds a bare repo with a branch whose name contains "/", an annotated tag
+and a few directories, then checks parse_repo_url() on URLs naming
+branches, tags, full and short SHAs and paths, that _fetch_subtree() over
+file:// downloads only the blobs under the requested path, and that
+clone_and_build_graph() indexes exactly that subtree at that ref. Exits
+non-zero on any failure.
+
+Run from the repo root:
+    python benchmarks/check_repo_urls.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from repo_loader import RepoSpec, _fetch_subtree, _resolve_commit, clone_and_build_graph, parse_repo_url  # noqa: E402
+
+failures = []
+
+GIT_ENV = {**os.environ, "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+           "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com"}
+
+
+def check(condition: bool, what: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {what}")
+    if not condition:
+        failures.append(what)
+
+
+def git(*args, cwd) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, env=GIT_ENV, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def write(root: Path, files: dict):
+    for rel_path, text in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def make_bare_repo(tmp: Path) -> tuple[Path, dict]:
+    """A bare repo serving partial clones, and {name: commit} of its interesting revisions."""
+    work = tmp / "work"
+    work.mkdir()
+    git("init", "-q", "-b", "main", cwd=work)
+    write(work, {
+        "README.md": "# Demo\n",
+        "src/app/main.py": "def main():\n    return 1\n",
+        "src/lib/util.py": "def helper():\n    return 2\n",
+        "docs/guide.md": "# Guide\n",
+    })
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "one", cwd=work)
+    commits = {"first": git("rev-parse", "HEAD", cwd=work)}
+    git("tag", "-a", "v1.0", "-m", "release", cwd=work)
+
+    git("checkout", "-q", "-b", "feature/new-ui", cwd=work)
+    write(work, {"src/app/ui.py": "def render():\n    return 3\n"})
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "ui", cwd=work)
+    commits["feature"] = git("rev-parse", "HEAD", cwd=work)
+    git("checkout", "-q", "main", cwd=work)
+
+    bare = tmp / "repo.git"
+    git("clone", "-q", "--bare", str(work), str(bare), cwd=tmp)
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=bare)
+    return bare, commits
+
+
+def check_parse(base: str, url: str, commits: dict):
+    short = commits["first"][:8]
+    cases = [
+        (base, RepoSpec(url, "", "")),
+        (base + "/tree/main", RepoSpec(url, "main", "")),
+        (base + "/tree/main/src/app", RepoSpec(url, "main", "src/app")),
+        (base + "/tree/feature/new-ui", RepoSpec(url, "feature/new-ui", "")),
+        (base + "/tree/feature/new-ui/src/app/", RepoSpec(url, "feature/new-ui", "src/app")),
+        (base + "/tree/v1.0/docs", RepoSpec(url, "v1.0", "docs")),
+        (base + f"/tree/{commits['first']}/src", RepoSpec(url, commits["first"], "src")),
+        (base + f"/tree/{short}/src/lib", RepoSpec(url, short, "src/lib")),
+        ("https://github.com/owner/repo/tree/main", RepoSpec("https://github.com/owner/repo.git", "main", "")),
+    ]
+    for given, expected in cases:
+        got = parse_repo_url(given)
+        check(got == expected, f"parse_repo_url({given.replace(base, '<repo>')!r}) -> {tuple(got)[1:]}")
+    try:
+        parse_repo_url(base + "/tree/main/../etc")
+        check(False, "'..' in the path is rejected")
+    except ValueError:
+        check(True, "'..' in the path is rejected")
+
+    check(_resolve_commit(RepoSpec(url, "feature/new-ui")) == commits["feature"], "a branch with '/' resolves")
+    check(_resolve_commit(RepoSpec(url, "v1.0")) == commits["first"], "an annotated tag resolves to its commit")
+    check(_resolve_commit(RepoSpec(url, "")) == commits["first"], "no ref resolves to HEAD")
+
+
+def check_sparse_fetch(url: str, tmp: Path, commits: dict):
+    for ref in ("feature/new-ui", commits["first"][:8]):
+        checkout = Path(tempfile.mkdtemp(dir=tmp))
+        _fetch_subtree(RepoSpec(url, ref, "src/app"), str(checkout))
+        files = {p.relative_to(checkout).as_posix() for p in checkout.rglob("*")
+                 if p.is_file() and ".git" not in p.parts}
+        expected = {"README.md", "src/app/main.py"} | ({"src/app/ui.py"} if ref == "feature/new-ui" else set())
+        check(files == expected, f"sparse checkout of src/app at {ref} has {sorted(files)}")
+        head = git("rev-parse", "HEAD", cwd=checkout)
+        check(head == (commits["feature"] if ref == "feature/new-ui" else commits["first"]),
+              f"sparse checkout at {ref} is at the right commit")
+        missing = git("rev-list", "--objects", "--missing=print", "HEAD", cwd=checkout).splitlines()
+        missing = [line for line in missing if line.startswith("?")]
+        check(len(missing) >= 2, f"blobs outside src/app were not downloaded ({len(missing)} missing)")
+
+
+def check_loads(base: str, commits: dict):
+    graph, info = clone_and_build_graph(base + "/tree/feature/new-ui/src/app", use_cache=False)
+    check(sorted(graph.get_all_files()) == ["src/app/main.py", "src/app/ui.py"],
+          f"load of src/app on feature/new-ui indexes {sorted(graph.get_all_files())}")
+    check(info["commit"] == commits["feature"] and info["subdir"] == "src/app", "load records commit and path")
+    graph, info = clone_and_build_graph(base + f"/tree/{commits['first'][:8]}/src", use_cache=False)
+    check(sorted(graph.get_all_files()) == ["src/app/main.py", "src/lib/util.py"],
+          f"load of src at a short SHA indexes {sorted(graph.get_all_files())}")
+    check(info["commit"] == commits["first"], "load at a short SHA records the full commit")
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="reporover_check_urls_") as tmp:
+        tmp = Path(tmp)
+        bare, commits = make_bare_repo(tmp)
+        base = bare.as_uri()
+        url = parse_repo_url(base).url
+        check_parse(base, url, commits)
+        check_sparse_fetch(url, tmp, commits)
+        check_loads(base, commits)
+
+    print("OK" if not failures else f"FAILED: {len(failures)} checks")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+load_test.py — Many simulated users loading repos and asking questions at once.
+
+Each session follows the app's flow headlessly: submit a load job for a
+synthetic file:// repo, poll it at the app's refresh rate until it is done,
+then stream a scripted sequence of questions through stream_answer(). The
+chat model is a local stub with configurable time-to-first-token and
+per-token delay, so the numbers reflect RepoRover itself plus a modelled
+LLM, never a real API. Reports p50/p95/p99 latency of loads, answers and
+first tokens, throughput and peak RSS, and saves them as JSON tagged with
+the current git commit.
+
+Run from the repo root:
+    python benchmarks/load_test.py [--sessions 20] [--repos 2] [--files 500]
+                                   [--llm-first-token 0.5] [--llm-token 0.01]
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+from bench_ingest import RESULTS_DIR, _git_commit, _peak_rss_mb  # noqa: E402
+from load_jobs import DONE, PROGRESS_HZ, get_default_job_manager  # noqa: E402
+from llm_engine import stream_answer  # noqa: E402
+from synth_repo import make_repo  # noqa: E402
+
+# The app's suggested questions plus a few specific ones
+QUESTIONS = (
+    "What does this repo do?",
+    "What are the main classes?",
+    "Where is the main entry point?",
+    "how are user sessions cached",
+    "where is the order parser",
+)
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that waits `first_token_s`, then streams `tokens` words `token_s` apart."""
+
+    model_name: str = "stub"
+    first_token_s: float = 0.5
+    token_s: float = 0.01
+    tokens: int = 150
+
+    @property
+    def _llm_type(self) -> str:
+        return "reporover-stub"
+
+    def _words(self, messages) -> Iterator[str]:
+        time.sleep(self.first_token_s)
+        prompt = " ".join(str(m.content) for m in messages).split()
+        for i in range(self.tokens):
+            if i:
+                time.sleep(self.token_s)
+            yield (prompt[i % len(prompt)] if prompt else "word") + " "
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._words(messages))))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for word in self._words(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class Recorder:
+    """Latency samples per metric, appended from many session threads."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add(self, metric: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(metric, []).append(seconds)
+
+    def error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0], "p99": values[0], "max": values[0], "n": 1}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(values), "n": len(values)}
+
+
+def run_session(n: int, url: str, questions: list, llm, args, rec: Recorder):
+    """One user: load the repo like app.py does, then ask the questions in order."""
+    t0 = time.perf_counter()
+    job = get_default_job_manager().submit(url, use_cache=args.warm_cache)
+    while job.active:
+        time.sleep(1 / PROGRESS_HZ)
+    if job.state != DONE:
+        rec.error(f"session {n}: load {job.state}: {job.error}")
+        return
+    rec.add("load", time.perf_counter() - t0)
+
+    with job.handle as handle:
+        for question in questions:
+            t0 = time.perf_counter()
+            first = None
+            try:
+                stream = stream_answer(question, handle.graph, llm=llm, use_cache=args.answer_cache)
+                for _ in stream:
+                    if first is None:
+                        first = time.perf_counter() - t0
+            except Exception as e:
+                rec.error(f"session {n}: {question!r}: {e}")
+                continue
+            rec.add("answer", time.perf_counter() - t0)
+            rec.add("first_token", first or 0.0)
+            rec.add("context", stream.result["timings"].get("retrieval", 0.0)
+                    + stream.result["timings"].get("expand", 0.0) + stream.result["timings"].get("context", 0.0))
+            if args.think_time:
+                time.sleep(args.think_time)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=20, help="simulated users")
+    ap.add_argument("--repos", type=int, default=2, help="distinct repos, assigned to sessions round-robin")
+    ap.add_argument("--files", type=int, default=500, help="files per synthetic repo")
+    ap.add_argument("--questions", type=int, default=len(QUESTIONS), help="questions per session")
+    ap.add_argument("--ramp", type=float, default=5.0, help="seconds over which sessions start")
+    ap.add_argument("--think-time", type=float, default=0.0, help="pause between a session's questions")
+    ap.add_argument("--llm-first-token", type=float, default=0.5, help="stub model time to first token (s)")
+    ap.add_argument("--llm-token", type=float, default=0.01, help="stub model delay per further token (s)")
+    ap.add_argument("--llm-tokens", type=int, default=150, help="tokens per stub answer")
+    ap.add_argument("--warm-cache", action="store_true", help="let loads use the on-disk graph and parse caches")
+    ap.add_argument("--answer-cache", action="store_true", help="let repeated questions hit the answer cache")
+    ap.add_argument("--output", help="results file (default benchmarks/results/loadtest-<commit>.json)")
+    args = ap.parse_args()
+
+    llm = StubChatModel(first_token_s=args.llm_first_token, token_s=args.llm_token, tokens=args.llm_tokens)
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+    rec = Recorder()
+
+    with tempfile.TemporaryDirectory(prefix="reporover_loadtest_") as tmp:
+        urls = [make_repo(Path(tmp) / f"repo{i}", files=args.files, py_ratio=0.7, file_lines=120,
+                          depth=3, seed=i) for i in range(args.repos)]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = []
+            for n in range(args.sessions):
+                futures.append(pool.submit(run_session, n, urls[n % len(urls)], questions, llm, args, rec))
+                if args.sessions > 1:
+                    time.sleep(args.ramp / (args.sessions - 1))
+            for future in futures:
+                future.result()
+        duration = time.perf_counter() - t0
+
+    answers = len(rec.samples.get("answer", ()))
+    result = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "duration_s": duration,
+        "answers_per_s": answers / duration,
+        "loads_per_s": len(rec.samples.get("load", ())) / duration,
+        "peak_rss_mb": _peak_rss_mb(),
+        "latency_s": {metric: percentiles(values) for metric, values in rec.samples.items()},
+        "errors": rec.errors,
+    }
+
+    print(f"{args.sessions} sessions, {args.repos} repos x {args.files} files, "
+          f"{answers} answers in {duration:.1f}s")
+    print(f"{'latency (s)':14s}{'p50':>9s}{'p95':>9s}{'p99':>9s}{'max':>9s}{'n':>6s}")
+    for metric, stats in result["latency_s"].items():
+        print(f"{metric:14s}" + "".join(f"{stats[k]:9.3f}" for k in ("p50", "p95", "p99", "max"))
+              + f"{stats['n']:6d}")
+    print(f"throughput    {result['answers_per_s']:.2f} answers/s")
+    print(f"peak RSS      {result['peak_rss_mb']:.0f} MB")
+    for error in rec.errors:
+        print(f"error: {error}")
+
+    commit = _git_commit()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        **result,
+    }, indent=2))
+    print(f"\nSaved {output}")
+    sys.exit(1 if rec.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+stress_parser.py — Concurrent loads must build the same graphs as one load
+at a time.
+
+Builds a synthetic repo, loads it once serially as the reference, then runs
+N loads at once on threads (as concurrent Streamlit sessions would) and
+checks every graph matches the reference: same files, entities, byte
+ranges, content and IMPORTS/CALLS edges. Also hammers parse_file directly
+from many threads. Exits non-zero on any mismatch.
+
+Throughput is reported against loads run one after another. Parsing,
+graph building, linking and indexing all hold the GIL, so with in-process
+parsing (--workers 1, the default) concurrent loads get about 1x, not Nx;
+--workers N parses each load's files in N processes instead.
+
+Run from the repo root:
+    python benchmarks/stress_parser.py [--loads 8] [--files 300] [--rounds 3] [--workers 1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from repo_loader import clone_and_build_graph  # noqa: E402
+from step1_parser import PARSE_THREADS, parse_file  # noqa: E402
+from synth_repo import make_repo, python_module  # noqa: E402
+
+
+def fingerprint(graph) -> tuple:
+    """Everything a load decides: entities with their ranges and text, and link edges."""
+    entities = sorted(
+        (e["filename"], e["name"], e.get("type"), e.get("start_line"), e.get("end_line"), graph.get_content(e))
+        for e in graph.get_all_entities()
+    )
+    edges = sorted((src, dst, rel) for src, targets in graph._refs_out.items() for dst, rel in targets)
+    return tuple(sorted(graph.get_all_files())), tuple(entities), tuple(edges)
+
+
+def load(url: str, workers: int = 1) -> tuple:
+    graph, info = clone_and_build_graph(url, workers=workers, use_cache=False)
+    return fingerprint(graph), info["timings"]
+
+
+def stress_loads(url: str, loads: int, rounds: int, workers: int) -> int:
+    t0 = time.perf_counter()
+    reference, timings = load(url, workers)
+    serial_s = time.perf_counter() - t0
+    print(f"reference load: {len(reference[1])} entities, {len(reference[2])} edges in {serial_s:.2f}s")
+    stages = ("read", "parse", "graph", "link", "index")
+    print("  stages (holding the GIL; read/parse not with --workers > 1): "
+          + ", ".join(f"{s} {timings.get(s, 0):.2f}s" for s in stages))
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=loads) as pool:
+        for r in range(rounds):
+            t0 = time.perf_counter()
+            results = [result for result, _ in pool.map(load, [url] * loads, [workers] * loads)]
+            elapsed = time.perf_counter() - t0
+            bad = sum(result != reference for result in results)
+            failures += bad
+            print(f"round {r + 1}: {loads} concurrent loads in {elapsed:.2f}s "
+                  f"({loads * serial_s / elapsed:.2f}x serial throughput), {bad} mismatched")
+    return failures
+
+
+def stress_parse(threads: int, files: int) -> int:
+    import random
+
+    rng = random.Random(0)
+    sources = [python_module(rng, rng.randint(40, 400)) for _ in range(files)]
+    reference = [parse_file(s) for s in sources]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(parse_file, sources * threads))
+    bad = sum(result != reference[i % files] for i, result in enumerate(results))
+    print(f"parse_file: {len(results)} parses on {threads} threads, {bad} mismatched")
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--loads", type=int, default=8, help="concurrent loads per round")
+    ap.add_argument("--files", type=int, default=300)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=1, help="parse processes per load (1 = shared parse threads)")
+    args = ap.parse_args()
+    print(f"parse threads: {PARSE_THREADS}, workers per load: {args.workers}, CPUs: {os.cpu_count()}")
+
+    failures = stress_parse(args.loads, 200)
+    with tempfile.TemporaryDirectory(prefix="reporover_stress_") as tmp:
+        url = make_repo(Path(tmp) / "repo", files=args.files, py_ratio=0.7, file_lines=150, depth=3, seed=0)
+        failures += stress_loads(url, args.loads, args.rounds, args.workers)
+
+    print("OK" if not failures else f"FAILED: {failures} mismatched results")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
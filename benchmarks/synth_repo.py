@@ -0,0 +1,131 @@
+"""
+synth_repo.py — Generate a synthetic local git repo for ingestion benchmarks.
+
+Run from the repo root:  python benchmarks/synth_repo.py /tmp/synth --files 2000
+"""
+import argparse
+import json
+import random
+import subprocess
+from pathlib import Path
+
+WORDS = ("user", "order", "cache", "graph", "token", "client", "request", "config",
+         "parser", "session", "record", "index", "stream", "buffer", "report", "worker")
+
+OTHER_KINDS = (".md", ".js", ".json", ".yaml", ".txt")
+
+
+def _name(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+
+def python_module(rng: random.Random, lines: int, imports=(), defined=None) -> str:
+    """
+    Roughly `lines` lines of classes, methods and functions. `imports` lists
+    (dotted module, function names) of other modules to import, alternately
+    by name and as a module alias, and call from functions here; methods
+    also call sibling methods. Top-level function names are appended to
+    `defined`, if given.
+    """
+    out = ['"""Synthetic module."""', "import os"]
+    callees = []
+    for i, (module, names) in enumerate(imports):
+        name = rng.choice(names)
+        if i % 2:
+            out.append(f"import {module} as mod{i}")
+            callees.append(f"mod{i}.{name}")
+        else:
+            out.append(f"from {module} import {name}")
+            callees.append(name)
+    out.append("")
+    while len(out) < lines:
+        if rng.random() < 0.4:
+            cls = _name(rng).title().replace("_", "")
+            out.append(f"class {cls}:")
+            out.append(f'    """{cls} docs."""')
+            methods = []
+            for _ in range(rng.randint(1, 4)):
+                method = _name(rng)
+                out.append(f"    def {method}(self, value):")
+                out.extend(f"        value = value + {i}" for i in range(rng.randint(1, 6)))
+                if methods and rng.random() < 0.5:
+                    out.append(f"        value = self.{rng.choice(methods)}(value)")
+                out.append("        return value")
+                out.append("")
+                methods.append(method)
+        else:
+            function = _name(rng, 3)
+            out.append(f"def {function}(items, limit=10):")
+            out.extend(f"    items = [x for x in items if x != {i}]" for i in range(rng.randint(1, 8)))
+            if callees and rng.random() < 0.6:
+                out.append(f"    items = {rng.choice(callees)}(items)")
+            out.append("    return items[:limit]")
+            out.append("")
+            if defined is not None:
+                defined.append(function)
+    return "\n".join(out) + "\n"
+
+
+def other_file(rng: random.Random, suffix: str, lines: int) -> str:
+    if suffix == ".json":
+        return json.dumps({_name(rng): i for i in range(lines)}, indent=2) + "\n"
+    if suffix == ".yaml":
+        return "\n".join(f"{_name(rng)}_{i}: {rng.randint(0, 999)}" for i in range(lines)) + "\n"
+    if suffix == ".js":
+        return "\n".join(f"function {_name(rng)}{i}(x) {{ return x + {i}; }}" for i in range(lines)) + "\n"
+    if suffix == ".md":
+        return "# Notes\n\n" + "\n".join(f"- {_name(rng, 4).replace('_', ' ')}" for _ in range(lines)) + "\n"
+    return "\n".join(_name(rng, 6).replace("_", " ") for _ in range(lines)) + "\n"
+
+
+def make_repo(path, files: int = 500, py_ratio: float = 0.7, file_lines: int = 120,
+              depth: int = 3, seed: int = 0) -> str:
+    """
+    Write `files` files under `path` (a fresh directory), spread over
+    directories nested up to `depth` levels, commit them and return the
+    repo's file:// URL.
+    """
+    rng = random.Random(seed)
+    root = Path(path).resolve()
+    root.mkdir(parents=True, exist_ok=False)
+    modules = []  # (dotted name, top-level functions) of the Python files so far
+
+    for n in range(files):
+        parts = [f"pkg{rng.randint(0, 7)}" for _ in range(rng.randint(0, depth))]
+        directory = root.joinpath(*parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = max(1, int(rng.gauss(file_lines, file_lines / 3)))
+        if rng.random() < py_ratio:
+            # Import from and call into a few earlier modules, so loads have IMPORTS/CALLS edges
+            stem = f"{_name(rng)}_{n}"
+            imports = rng.sample(modules, min(len(modules), rng.randint(0, 3)))
+            defined = []
+            (directory / f"{stem}.py").write_text(python_module(rng, lines, imports, defined))
+            if defined:
+                modules.append((".".join(parts + [stem]), defined))
+        else:
+            suffix = rng.choice(OTHER_KINDS)
+            (directory / f"{_name(rng)}_{n}{suffix}").write_text(other_file(rng, suffix, lines))
+
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com",
+           "-c", "init.defaultBranch=main"]
+    subprocess.run(git + ["init", "-q"], cwd=root, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=root, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "synthetic"], cwd=root, check=True)
+    return root.as_uri()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("path")
+    ap.add_argument("--files", type=int, default=500)
+    ap.add_argument("--py-ratio", type=float, default=0.7)
+    ap.add_argument("--file-lines", type=int, default=120)
+    ap.add_argument("--depth", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(make_repo(args.path, args.files, args.py_ratio, args.file_lines, args.depth, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+chunkers.py — Split non-Python files into sections that are indexed as
+separate entities: Markdown by heading, JSON/YAML/TOML by top-level key,
+JS/TS by function and class, anything else by line windows.
+
+Chunkers are looked up by filename pattern; register_chunker() adds or
+overrides one. A chunker takes the file's text and returns Chunks with
+0-based, inclusive line ranges.
+"""
+import fnmatch
+import re
+from typing import NamedTuple
+
+
+class Chunk(NamedTuple):
+    name: str          # heading, key, function/class name or "lines a-b"
+    kind: str          # "section", "key", "table", "function", "class", "code" or "lines"
+    start_line: int
+    end_line: int
+
+
+# Files shorter than this stay a single entity
+MIN_CHUNK_LINES = 60
+
+# Chunks longer than this are split further into windows of this many lines
+MAX_CHUNK_LINES = 200
+
+_registry = []  # (patterns, chunker), newest first
+
+
+def register_chunker(patterns, chunker=None):
+    """
+    Use `chunker(text) -> list[Chunk]` for files whose name matches any of
+    `patterns` (fnmatch, case-insensitive, e.g. "*.md"). Later
+    registrations win. Usable as a decorator when `chunker` is omitted.
+    """
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+    patterns = tuple(p.lower() for p in patterns)
+
+    def register(func):
+        _registry.insert(0, (patterns, func))
+        return func
+
+    return register(chunker) if chunker is not None else register
+
+
+def get_chunker(filename: str):
+    name = filename.rsplit("/", 1)[-1].lower()
+    for patterns, chunker in _registry:
+        if any(fnmatch.fnmatchcase(name, p) for p in patterns):
+            return chunker
+    return chunk_lines
+
+
+def chunk_file(filename: str, text: str) -> list[Chunk]:
+    """
+    Chunks of a non-Python file, or [] when it is short enough to be kept
+    whole. Oversized chunks are split into line windows and repeated names
+    get a " (2)", " (3)" suffix so every chunk is addressable.
+    """
+    lines = text.count("\n") + 1
+    if lines < MIN_CHUNK_LINES:
+        return []
+    chunks = []
+    for chunk in get_chunker(filename)(text):
+        if chunk.end_line - chunk.start_line + 1 > MAX_CHUNK_LINES:
+            for part in _windows(chunk.start_line, chunk.end_line, MAX_CHUNK_LINES):
+                chunks.append(Chunk(f"{chunk.name} [lines {part.start_line + 1}-{part.end_line + 1}]",
+                                    chunk.kind, part.start_line, part.end_line))
+        else:
+            chunks.append(chunk)
+
+    seen = {}
+    for i, chunk in enumerate(chunks):
+        n = seen[chunk.name] = seen.get(chunk.name, 0) + 1
+        if n > 1:
+            chunks[i] = chunk._replace(name=f"{chunk.name} ({n})")
+    return chunks
+
+
+def _windows(first: int, last: int, size: int) -> list[Chunk]:
+    return [Chunk(f"lines {start + 1}-{min(start + size - 1, last) + 1}", "lines", start, min(start + size - 1, last))
+            for start in range(first, last + 1, size)]
+
+
+def _split_at(starts: list[tuple[int, str]], n_lines: int, kind: str, preamble: str) -> list[Chunk]:
+    """Chunks from (line, name) boundaries: each runs until the next one starts."""
+    chunks = []
+    if starts and starts[0][0] > 0:
+        chunks.append(Chunk(preamble, kind, 0, starts[0][0] - 1))
+    for i, (line, name) in enumerate(starts):
+        end = starts[i + 1][0] - 1 if i + 1 < len(starts) else n_lines - 1
+        chunks.append(Chunk(name, kind, line, end))
+    return chunks
+
+
+# ── Markdown ───────────────────────────────────────────────────────────────────
+
+_HEADING = re.compile(r"^(#{1,3})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def chunk_markdown(text: str) -> list[Chunk]:
+    """One section per heading (levels 1-3), ignoring '#' lines inside code fences."""
+    lines = text.split("\n")
+    starts = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            m = _HEADING.match(line)
+            if m:
+                starts.append((i, m.group(2)))
+    return _split_at(starts, len(lines), "section", "(intro)") or _windows(0, len(lines) - 1, MAX_CHUNK_LINES)
+
+
+# ── JSON / YAML / TOML ─────────────────────────────────────────────────────────
+
+def chunk_json(text: str) -> list[Chunk]:
+    """One chunk per key of the top-level object, found by a string-aware scan."""
+    starts = []
+    depth = 0
+    line = 0
+    in_string = False
+    escaped = False
+    key_start = None
+    key_chars = []
+    expect_key = False
+    for ch in text:
+        if ch == "\n":
+            line += 1
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                if key_start is not None:
+                    starts.append((key_start, "".join(key_chars)))
+                    key_start = None
+            elif key_start is not None:
+                key_chars.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+            if depth == 1 and expect_key:
+                key_start, key_chars = line, []
+                expect_key = False
+        elif ch in "{[":
+            depth += 1
+            expect_key = depth == 1 and ch == "{"
+        elif ch in "}]":
+            depth -= 1
+        elif ch == "," and depth == 1:
+            expect_key = True
+    n_lines = line + 1
+    if starts:
+        starts[0] = (0, starts[0][1])  # the opening brace goes with the first key
+    return _split_at(starts, n_lines, "key", "(start)") or _windows(0, n_lines - 1, MAX_CHUNK_LINES)
+
+
+_YAML_KEY = re.compile(r"""^(?:"([^"]+)"|'([^']+)'|([^\s#:'"-][^:#]*?))\s*:(?:\s|$)""")
+
+
+def chunk_yaml(text: str) -> list[Chunk]:
+    """One chunk per top-level mapping key (a key at column 0)."""
+    lines = text.split("\n")
+    starts = []
+    for i, line in enumerate(lines):
+        m = _YAML_KEY.match(line)
+        if m:
+            starts.append((i, m.group(1) or m.group(2) or m.group(3)))
+    return _split_at(starts, len(lines), "key", "(start)") or _windows(0, len(lines) - 1, MAX_CHUNK_LINES)
+
+
+_TOML_TABLE = re.compile(r"^\s*\[\[?\s*([^\]]+?)\s*\]\]?\s*(?:#.*)?$")
+
+
+def chunk_toml(text: str) -> list[Chunk]:
+    """One chunk per [table] / [[array of tables]]; keys before the first table form one chunk."""
+    lines = text.split("\n")
+    starts = [(i, m.group(1)) for i, line in enumerate(lines) if (m := _TOML_TABLE.match(line))]
+    return _split_at(starts, len(lines), "table", "(top-level keys)") or _windows(0, len(lines) - 1, MAX_CHUNK_LINES)
+
+
+# ── JavaScript / TypeScript ────────────────────────────────────────────────────
+
+_JS_DEFINITION = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?"
+    r"(?:(?:async\s+)?function\s*\*?\s*(?P<function>[\w$]+)"
+    r"|class\s+(?P<class>[\w$]+)"
+    r"|(?:const|let|var)\s+(?P<arrow>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[\w$]+\s*=>))"
+)
+
+
+def _block_end(lines: list[str], first: int) -> int:
+    """Line where the brace block opened on or after `first` closes (rough: skips strings and // comments)."""
+    depth = 0
+    opened = False
+    for i in range(first, len(lines)):
+        quote = None
+        line = lines[i]
+        j = 0
+        while j < len(line):
+            ch = line[j]
+            if quote:
+                if ch == "\\":
+                    j += 1
+                elif ch == quote:
+                    quote = None
+            elif ch in "\"'`":
+                quote = ch
+            elif ch == "/" and line.startswith("//", j):
+                break
+            elif ch == "{":
+                depth += 1
+                opened = True
+            elif ch == "}":
+                depth -= 1
+                if opened and depth == 0:
+                    return i
+            j += 1
+        if not opened and (line.rstrip().endswith(";")
+                           or i + 1 < len(lines) and _JS_DEFINITION.match(lines[i + 1])):
+            return i  # arrow function without braces
+    return len(lines) - 1
+
+
+def chunk_javascript(text: str) -> list[Chunk]:
+    """
+    Top-level functions, classes and arrow-function constants, by regex and
+    brace matching. The code between them (imports, route registrations,
+    exports, ...) becomes "(top-level code)" chunks, so every line is indexed.
+    """
+    lines = text.split("\n")
+    chunks = []
+    gap_start = 0
+    i = 0
+
+    def add_gap(end):
+        if any(line.strip() for line in lines[gap_start:end + 1]):
+            chunks.append(Chunk("(top-level code)", "code", gap_start, end))
+
+    while i < len(lines):
+        m = _JS_DEFINITION.match(lines[i])
+        if m:
+            add_gap(i - 1)
+            end = _block_end(lines, i)
+            kind = "class" if m.group("class") else "function"
+            chunks.append(Chunk(m.group("function") or m.group("class") or m.group("arrow"), kind, i, end))
+            i = gap_start = end + 1
+        else:
+            i += 1
+    add_gap(len(lines) - 1)
+    return chunks or _windows(0, len(lines) - 1, MAX_CHUNK_LINES)
+
+
+def chunk_lines(text: str) -> list[Chunk]:
+    """Fixed windows of MAX_CHUNK_LINES lines."""
+    return _windows(0, text.count("\n"), MAX_CHUNK_LINES)
+
+
+register_chunker(("*.md", "*.markdown", "*.mdx"), chunk_markdown)
+register_chunker(("*.json",), chunk_json)
+register_chunker(("*.yaml", "*.yml"), chunk_yaml)
+register_chunker(("*.toml",), chunk_toml)
+register_chunker(("*.js", "*.jsx", "*.mjs", "*.cjs", "*.ts", "*.tsx", "*.mts", "*.cts"), chunk_javascript)
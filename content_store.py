@@ -0,0 +1,101 @@
+"""
+content_store.py — Per-repo blob of file contents that graph nodes point into.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+
+# Where blob files are created; they are unlinked immediately and vanish with the process
+BLOB_DIR = os.environ.get("REPOROVER_BLOB_DIR") or None
+
+
+class ContentStore:
+    """
+    Append-only, content-addressed byte store backed by an anonymous temp
+    file and read through mmap. Each distinct file body is written once;
+    entities reference (offset, length) ranges inside it, so nested
+    functions and methods share their enclosing file's bytes and the text
+    only becomes a Python string when it is read.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(prefix="reporover_blob_", dir=BLOB_DIR)
+        self._size = 0
+        self._offsets = {}   # blake2b digest of a body -> its offset
+        self._map = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, data: bytes) -> int:
+        """Store `data` (once per distinct body) and return its offset."""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            offset = self._offsets.get(digest)
+            if offset is None:
+                offset = self._size
+                self._file.seek(offset)
+                self._file.write(data)
+                self._size += len(data)
+                self._offsets[digest] = offset
+            return offset
+
+    def read_bytes(self, offset: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        view = self._map
+        if view is None or offset + length > len(view):
+            view = self._remap()
+        return view[offset:offset + length]
+
+    def read(self, offset: int, length: int) -> str:
+        return self.read_bytes(offset, length).decode("utf8", errors="ignore")
+
+    def _remap(self):
+        with self._lock:
+            if self._map is None or len(self._map) < self._size:
+                self._file.flush()
+                # The old map stays valid for readers still holding it
+                self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+            return self._map
+
+    def to_bytes(self) -> bytes:
+        return self.read_bytes(0, self._size)
+
+    def live_bytes(self, ranges) -> tuple[bytes, dict]:
+        """
+        Only the bytes that (offset, length) `ranges` cover, overlapping or
+        touching ranges merged, and {old offset: new offset} for each range.
+        Bodies of removed or replaced files, and text between entities, are
+        left behind.
+        """
+        out = bytearray()
+        moved = {}
+        start = end = 0  # current run of live bytes, not yet copied
+        for offset, length in sorted(set(ranges)):
+            if offset > end:
+                out += self.read_bytes(start, end - start)
+                start, end = offset, offset + length
+            else:
+                end = max(end, offset + length)
+            moved[offset] = len(out) + offset - start
+        out += self.read_bytes(start, end - start)
+        return bytes(out), moved
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ContentStore":
+        """A store holding `data` verbatim, so serialized offsets stay valid."""
+        store = cls()
+        store._file.write(data)
+        store._size = len(data)
+        return store
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
@@ -0,0 +1,161 @@
+"""
+context_builder.py — Pack code entities into LLM context under a token budget.
+"""
+import os
+import re
+
+# Tokens of context sent with each question (system prompt and answer not included)
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("REPOROVER_CONTEXT_TOKENS", "6000"))
+
+# Rough BPE approximation: words split every 8 letters, numbers every 3
+# digits, and each punctuation character counts on its own.
+_TOKEN = re.compile(r"[A-Za-z]{1,8}|\d{1,3}|[^\sA-Za-z\d]")
+
+# Kept back so the "... omitted" note always fits
+_NOTE_RESERVE = 24
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def entity_kind(e: dict) -> str:
+    t = e.get("type")
+    if t == "file_summary":
+        return f"summary of {e.get('category', 'file')}"
+    if t == "chunk":
+        return e.get("chunk_kind", "section")
+    return "class" if t == "class_definition" else "function" if t == "function_definition" else "file"
+
+
+def signature(content: str, max_lines: int = 5) -> str:
+    """The def/class header of an entity: lines up to the one ending in ':'."""
+    lines = content.splitlines()
+    for i, line in enumerate(lines[:max_lines]):
+        if line.rstrip().endswith(":"):
+            return "\n".join(lines[:i + 1])
+    return "\n".join(lines[:1])
+
+
+def preview(content: str, lines: int) -> str:
+    head = content.splitlines()
+    if len(head) <= lines:
+        return content
+    return "\n".join(head[:lines]) + "\n    ..."
+
+
+class ContextAssembler:
+    """
+    Greedy packer: blocks are appended in priority order while they fit in
+    the budget. Entities that don't fit whole fall back to a shorter form.
+    `detail` counts how many entities went in at each level.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.budget = token_budget
+        self.used = 0
+        self.parts = []
+        self.detail = {"full": 0, "preview": 0, "signature": 0, "name": 0, "omitted": 0}
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - _NOTE_RESERVE - self.used
+
+    def add(self, text: str) -> bool:
+        cost = estimate_tokens(text) + 1  # + the joining newline
+        if self.used + cost > self.budget - _NOTE_RESERVE:
+            return False
+        self.parts.append(text)
+        self.used += cost
+        return True
+
+    def add_entity(self, header: str, content: str, levels=("full", "preview", "signature", "name"),
+                   preview_lines: int = 10, indent: str = "") -> bool:
+        """Add an entity's code at the most detailed level in `levels` that fits."""
+        for level in levels:
+            if level == "full":
+                body = content
+            elif level == "preview":
+                body = preview(content, preview_lines)
+            elif level == "signature":
+                body = signature(content)
+            else:
+                body = None
+            if body is not None and indent:
+                body = "\n".join(indent + line for line in body.splitlines())
+            block = header if body is None else f"{header}\n{body}"
+            if self.add(block):
+                self.detail[level] += 1
+                return True
+        self.detail["omitted"] += 1
+        return False
+
+    def render(self) -> str:
+        parts = self.parts
+        if self.detail["omitted"]:
+            parts = parts + [f"\n... ({self.detail['omitted']} more entities omitted to fit the context budget)"]
+        return "\n".join(parts)
+
+
+def build_ranked_context(graph, entities: list[dict], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                         related=(), full_entities: int = None) -> ContextAssembler:
+    """
+    Ranked entities of `graph`, best first: the first `full_entities` (all
+    if None) as full code if it fits, the rest as previews. `related` holds
+    (node_id, hop, how) from graph.get_neighborhood(); those are listed
+    after, as signatures, with how they connect to the ranked entities.
+    """
+    ctx = ContextAssembler(token_budget)
+    ctx.add("ENTITIES MOST RELEVANT TO THE QUESTION:")
+    for i, e in enumerate(entities):
+        levels = ("full", "preview", "signature", "name")
+        if full_entities is not None and i >= full_entities:
+            levels = levels[1:]
+        ctx.add_entity(f"\n--- [{entity_kind(e)}] {e['name']} in {e['filename']} ---", graph.get_content(e), levels)
+
+    shown = {(e.get("filename"), e.get("name")) for e in entities}
+    header_added = False
+    for node_id, hop, how in related:
+        e = graph.get_node(node_id)
+        if e is None or (e.get("filename"), e.get("name")) in shown:
+            continue
+        if not header_added:
+            ctx.add("\nRELATED CODE (through calls and imports):")
+            header_added = True
+        if e.get("node_type") == "file":
+            ctx.add(f"--- [file] {node_id} ({how}) ---")
+            continue
+        ctx.add_entity(f"--- [{entity_kind(e)}] {e['name']} in {e['filename']} ({how}) ---",
+                       graph.get_content(e), levels=("signature", "name"))
+    return ctx
+
+
+def build_repo_map(graph, token_budget: int = DEFAULT_TOKEN_BUDGET, preview_lines: int = 10,
+                   max_entities: int = None) -> ContextAssembler:
+    """
+    Every file with its entities as short previews. Once previews stop
+    fitting, entities degrade to signatures, then to bare names.
+    """
+    ctx = ContextAssembler(token_budget)
+    total = graph.get_stats()["total_entities"]
+    seen = 0
+    for filename in graph.get_all_files():
+        if ctx.remaining < 16 or (max_entities is not None and seen >= max_entities):
+            # Not even a bare name fits any more; count the rest without rendering it
+            ctx.detail["omitted"] += total - seen
+            break
+        entities = graph.get_entities_in_file(filename)
+        if not entities:
+            continue
+        seen += len(entities)
+        if not ctx.add(f"\n📄 FILE: {filename}"):
+            ctx.detail["omitted"] += len(entities)
+            continue
+        if max_entities is not None and seen > max_entities:
+            ctx.detail["omitted"] += seen - max_entities
+            entities = entities[:len(entities) - (seen - max_entities)]
+        for e in entities:
+            header = f"  [{entity_kind(e)}] {e['name']}  (line {e.get('start_line', '?')})"
+            ctx.add_entity(header, graph.get_content(e), levels=("preview", "signature", "name"),
+                           preview_lines=preview_lines, indent="    ")
+    return ctx
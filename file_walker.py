@@ -0,0 +1,271 @@
+"""
+file_walker.py — Stream the indexable files of a checkout.
+
+Skipped directories and .gitignore'd paths are pruned before descending,
+binaries are caught by extension or by a NUL byte in their first few KB,
+and files over the size cap are left out.
+"""
+import os
+import re
+from pathlib import Path
+
+BINARY_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".ico", ".bmp", ".webp",
+                     ".pdf", ".zip", ".tar", ".gz", ".7z", ".rar", ".exe",
+                     ".pyc", ".pyo", ".so", ".dll", ".dylib", ".bin", ".woff", ".woff2", ".ttf", ".otf"}
+
+# Directories never indexed
+SKIP_DIRS = {"__pycache__", ".git", "node_modules", "venv", ".venv", "env"}
+
+# Files larger than this are not indexed
+MAX_FILE_BYTES = int(os.environ.get("REPOROVER_MAX_FILE_KB", "1024")) * 1024
+
+# Bytes read to decide whether a file is binary
+SNIFF_BYTES = 8192
+
+# Files that say the most about a repo, ingested first so a partially
+# loaded graph can already answer overview questions
+ENTRY_POINT_NAMES = {"__main__.py", "main.py", "app.py", "cli.py", "manage.py", "server.py",
+                     "wsgi.py", "asgi.py", "setup.py", "pyproject.toml", "setup.cfg",
+                     "requirements.txt", "package.json", "index.js", "index.ts", "main.go",
+                     "main.rs", "cargo.toml", "go.mod", "dockerfile", "makefile"}
+
+SOURCE_EXTENSIONS = {".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".rb",
+                     ".c", ".h", ".cc", ".cpp", ".cs", ".php", ".swift", ".kt", ".scala"}
+
+
+def is_binary(path, sniff_bytes: int = SNIFF_BYTES) -> bool:
+    """True if the file has a binary extension or a NUL byte near its start."""
+    if Path(path).suffix.lower() in BINARY_EXTENSIONS:
+        return True
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(sniff_bytes)
+    except OSError:
+        return True
+
+
+def file_priority(rel_path: str) -> tuple:
+    """
+    Sort key putting high-value files first: the README, then entry points
+    and manifests, then top-level modules, then everything else from the
+    shallowest paths down, source before other files.
+    """
+    parts = rel_path.split("/")
+    name = parts[-1].lower()
+    depth = len(parts) - 1
+    suffix = os.path.splitext(name)[1]
+    if name.startswith("readme") and depth == 0:
+        tier = 0
+    elif name in ENTRY_POINT_NAMES and depth <= 1:
+        tier = 1
+    elif depth == 0 and suffix in SOURCE_EXTENSIONS:
+        tier = 2
+    else:
+        tier = 3
+    return tier, depth, suffix not in SOURCE_EXTENSIONS, rel_path
+
+
+def _glob_to_regex(pattern: str) -> str:
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    """
+    The rules of one .gitignore file. Patterns are matched against paths
+    relative to the directory holding the file, with git's semantics for
+    negation, directory-only rules (trailing "/"), anchoring and "**".
+    """
+
+    def __init__(self, lines):
+        self.rules = []  # (regex, negated, dir_only)
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip() if not line.endswith("\\ ") else line
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            prefix = "^" if anchored else "^(?:.*/)?"
+            self.rules.append((re.compile(prefix + _glob_to_regex(line) + "$"), negated, dir_only))
+
+    @classmethod
+    def from_file(cls, path):
+        try:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                return cls(f.readlines())
+        except OSError:
+            return None
+
+    def match(self, rel_path: str, is_dir: bool):
+        """True (ignored), False (re-included by "!") or None (no rule applies)."""
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+def _ignored(rel_path: str, is_dir: bool, ignores) -> bool:
+    """Verdict of the (base dir, GitIgnore) rules in effect, deepest .gitignore last."""
+    result = None
+    for base, rules in ignores:
+        sub = rel_path[len(base) + 1:] if base else rel_path
+        verdict = rules.match(sub, is_dir)
+        if verdict is not None:
+            result = verdict
+    return bool(result)
+
+
+def is_gitignored(root, rel_path: str, rules_cache: dict = None) -> bool:
+    """
+    Whether walk_repo() leaves rel_path out because of a .gitignore rule,
+    for the file itself or any directory above it. `rules_cache` (rel dir ->
+    GitIgnore or None) saves rereading .gitignore files across calls.
+    """
+    if rules_cache is None:
+        rules_cache = {}
+    parts = rel_path.split("/")
+    ignores = []
+    for depth in range(len(parts)):
+        rel_dir = "/".join(parts[:depth])
+        if rel_dir not in rules_cache:
+            rules_cache[rel_dir] = GitIgnore.from_file(os.path.join(root, rel_dir, ".gitignore"))
+        rules = rules_cache[rel_dir]
+        if rules is not None and rules.rules:
+            ignores.append((rel_dir, rules))
+        if _ignored("/".join(parts[:depth + 1]), depth < len(parts) - 1, ignores):
+            return True
+    return False
+
+
+def walk_repo(root, max_file_bytes: int = MAX_FILE_BYTES, skipped: dict = None, by_priority: bool = False):
+    """
+    Yield paths (relative to root, "/"-separated) of indexable files, in
+    sorted order per directory, as the walk goes. Symlinks are never followed.
+    With by_priority=True the tree is walked breadth-first instead, each
+    depth's files in file_priority() order (the top two depths ranked
+    together, so entry points one level down come early); a level is
+    listed before its first file is yielded, never the whole tree.
+    `skipped`, if given, is updated with counts per reason: "gitignored",
+    "binary" and "too_large".
+    """
+    root = os.fspath(root)
+    if skipped is None:
+        skipped = {}
+
+    def skip(reason):
+        skipped[reason] = skipped.get(reason, 0) + 1
+
+    def scan(dir_path, rel_dir, ignores):
+        """(is_dir, path, rel_path, ignores) of a directory's entries that pass the skip, ignore and size checks."""
+        rules = GitIgnore.from_file(os.path.join(dir_path, ".gitignore"))
+        if rules is not None and rules.rules:
+            ignores = ignores + [(rel_dir, rules)]
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return []
+
+        kept = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                if entry.name in SKIP_DIRS:
+                    continue
+                if _ignored(rel_path, True, ignores):
+                    skip("gitignored")
+                    continue
+                kept.append((True, entry.path, rel_path, ignores))
+            elif entry.is_file():
+                if _ignored(rel_path, False, ignores):
+                    skip("gitignored")
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if size > max_file_bytes:
+                    skip("too_large")
+                else:
+                    kept.append((False, entry.path, rel_path, ignores))
+        return kept
+
+    def sniffed(files):
+        # Reading the first bytes is the slow part, so it happens as files are yielded
+        for _, path, rel_path, _ in files:
+            if is_binary(path):
+                skip("binary")
+            else:
+                yield rel_path
+
+    def walk(dir_path, rel_dir, ignores):
+        for entry in scan(dir_path, rel_dir, ignores):
+            if entry[0]:
+                yield from walk(*entry[1:])
+            else:
+                yield from sniffed([entry])
+
+    if not by_priority:
+        yield from walk(root, "", [])
+        return
+
+    files = []
+    dirs = [(True, root, "", [])]
+    depth = 0
+    while dirs:
+        subdirs = []
+        for entry in dirs:
+            for child in scan(*entry[1:]):
+                (subdirs if child[0] else files).append(child)
+        dirs = subdirs
+        depth += 1
+        if depth == 1:
+            continue  # depths 0 and 1 are ranked together
+        files.sort(key=lambda f: file_priority(f[2]))
+        yield from sniffed(files)
+        files = []
+    files.sort(key=lambda f: file_priority(f[2]))
+    yield from sniffed(files)
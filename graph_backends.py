@@ -0,0 +1,397 @@
+"""
+graph_backends.py — Node/edge storage behind CodeGraph.
+
+NetworkXBackend keeps everything in an nx.DiGraph. CompactBackend stores the
+same data column-wise (interned strings, array columns, CSR adjacency) for
+repos with hundreds of thousands of entities; it builds an nx.DiGraph only
+when asked to.
+
+Both expose the same small interface: add_node / add_edge /
+add_nodes_from / add_edges_from / get / successors / remove_nodes /
+remove_edges / nodes / edges / clear / to_networkx.
+
+ReferenceTable holds the import and call references CodeGraph.link()
+resolves into edges, for either backend.
+"""
+from array import array
+
+import networkx as nx
+
+
+class NetworkXBackend:
+    def __init__(self):
+        self.nx = nx.DiGraph()
+
+    def __contains__(self, node_id):
+        return node_id in self.nx
+
+    def __len__(self):
+        return len(self.nx)
+
+    def get(self, node_id):
+        """The node's attribute dict (live, may be mutated), or None."""
+        return self.nx.nodes.get(node_id)
+
+    def add_node(self, node_id, attrs: dict):
+        self.nx.add_node(node_id, **attrs)
+
+    def add_edge(self, u, v, relation: str):
+        self.nx.add_edge(u, v, relation=relation)
+
+    def add_nodes_from(self, nodes):
+        """Add (node_id, attrs) pairs in one call, e.g. when restoring a serialized graph."""
+        self.nx.add_nodes_from(nodes)
+
+    def add_edges_from(self, edges):
+        self.nx.add_edges_from((u, v, {"relation": r}) for u, v, r in edges)
+
+    def successors(self, node_id) -> list:
+        return list(self.nx.successors(node_id))
+
+    def remove_nodes(self, node_ids):
+        self.nx.remove_nodes_from(node_ids)
+
+    def remove_edges(self, relations):
+        """Drop every edge whose relation is in `relations`."""
+        self.nx.remove_edges_from([(u, v) for u, v, r in self.nx.edges(data="relation") if r in relations])
+
+    def nodes(self):
+        return iter(self.nx.nodes(data=True))
+
+    def edges(self):
+        return ((u, v, d.get("relation")) for u, v, d in self.nx.edges(data=True))
+
+    def clear(self):
+        self.nx.clear()
+
+    def to_networkx(self):
+        return self.nx
+
+
+# Attributes stored as int columns; -1 marks "not set"
+_INT_COLUMNS = ("offset", "length", "start_line", "end_line")
+_ABSENT = -1
+
+
+class _Table:
+    """Interning table: small ints for repeated strings (types, names, paths)."""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value) -> int:
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+class CompactBackend:
+    """
+    Nodes are numbered in insertion order; each attribute is an array column
+    indexed by node number, with strings interned through _Table. Edges are
+    appended as (src, dst, relation) arrays and compiled into CSR adjacency
+    (indptr/indices) the first time successors are read after a change.
+
+    get() returns a fresh dict each call, so mutating it has no effect on
+    the stored node. Removed nodes are tombstoned and skipped.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._ids = []                 # node number -> node id (None once removed)
+        self._index = {}               # node id -> node number
+        self._strings = _Table()       # node_type, type, name and filename values
+        self._node_type = array("i")
+        self._kind = array("i")
+        self._name = array("i")
+        self._filename = array("i")
+        self._ints = {col: array("q") for col in _INT_COLUMNS}
+        self._str_columns = {"node_type": self._node_type, "type": self._kind,
+                             "name": self._name, "filename": self._filename}
+        self._extra = {}               # node number -> attributes without a column
+
+        self._relations = _Table()
+        self._src = array("i")
+        self._dst = array("i")
+        self._rel = array("i")
+        self._indptr = array("i", [0])
+        self._indices = array("i")
+        self._csr_rel = array("i")
+        self._csr_dirty = False
+
+    def __contains__(self, node_id):
+        return node_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    # ── Nodes ──────────────────────────────────────────────────────────────────
+
+    def _attrs(self, i: int) -> dict:
+        values = self._strings.values
+        d = {}
+        for key, column in self._str_columns.items():
+            code = column[i]
+            if code:
+                d[key] = values[code]
+        for key, column in self._ints.items():
+            v = column[i]
+            if v != _ABSENT:
+                d[key] = v
+        extra = self._extra.get(i)
+        if extra:
+            d.update(extra)
+        return d
+
+    def get(self, node_id):
+        i = self._index.get(node_id)
+        return None if i is None else self._attrs(i)
+
+    def add_node(self, node_id, attrs: dict):
+        i = self._index.get(node_id)
+        if i is not None:
+            # Same merge semantics as nx: existing attributes not in `attrs` survive
+            attrs = {**self._attrs(i), **attrs}
+        else:
+            i = len(self._ids)
+            self._ids.append(node_id)
+            self._index[node_id] = i
+            self._node_type.append(0)
+            self._kind.append(0)
+            self._name.append(0)
+            self._filename.append(0)
+            for column in self._ints.values():
+                column.append(_ABSENT)
+
+        code = self._strings.code
+        extra = {}
+        for key, value in attrs.items():
+            column = self._str_columns.get(key)
+            if column is not None and isinstance(value, str):
+                column[i] = code(value)
+            elif key in self._ints and isinstance(value, int) and value >= 0:
+                self._ints[key][i] = value
+            else:
+                extra[key] = value
+        if extra:
+            self._extra[i] = extra
+        else:
+            self._extra.pop(i, None)
+
+    def add_nodes_from(self, nodes):
+        for node_id, attrs in nodes:
+            self.add_node(node_id, attrs)
+
+    def remove_nodes(self, node_ids):
+        for node_id in node_ids:
+            i = self._index.pop(node_id, None)
+            if i is not None:
+                self._ids[i] = None
+                self._extra.pop(i, None)
+        # CSR rows of dead nodes are filtered on read, no rebuild needed
+
+    def nodes(self):
+        for i, node_id in enumerate(self._ids):
+            if node_id is not None:
+                yield node_id, self._attrs(i)
+
+    # ── Edges ──────────────────────────────────────────────────────────────────
+
+    def add_edge(self, u, v, relation: str):
+        for node_id in (u, v):
+            if node_id not in self._index:
+                self.add_node(node_id, {})
+        self._src.append(self._index[u])
+        self._dst.append(self._index[v])
+        self._rel.append(self._relations.code(relation))
+        self._csr_dirty = True
+
+    def add_edges_from(self, edges):
+        for u, v, relation in edges:
+            self.add_edge(u, v, relation)
+
+    def remove_edges(self, relations):
+        """Drop every edge whose relation is in `relations`."""
+        codes = {self._relations.codes[r] for r in relations if r in self._relations.codes}
+        if not codes:
+            return
+        keep = [j for j, r in enumerate(self._rel) if r not in codes]
+        self._src = array("i", (self._src[j] for j in keep))
+        self._dst = array("i", (self._dst[j] for j in keep))
+        self._rel = array("i", (self._rel[j] for j in keep))
+        self._csr_dirty = True
+
+    def _build_csr(self):
+        """
+        Compile appended edges into CSR, dropping edges of removed nodes and
+        repeated (u, v) pairs (first position wins, last relation wins),
+        matching DiGraph semantics.
+        """
+        ids = self._ids
+        position = {}
+        src, dst, rel = array("i"), array("i"), array("i")
+        for u, v, r in zip(self._src, self._dst, self._rel):
+            if ids[u] is None or ids[v] is None:
+                continue
+            key = (u, v)
+            j = position.get(key)
+            if j is None:
+                position[key] = len(src)
+                src.append(u)
+                dst.append(v)
+                rel.append(r)
+            else:
+                rel[j] = r
+        self._src, self._dst, self._rel = src, dst, rel
+
+        n = len(ids)
+        counts = array("i", bytes(4 * (n + 1)))
+        for u in src:
+            counts[u + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        indices = array("i", bytes(4 * len(src)))
+        csr_rel = array("i", bytes(4 * len(src)))
+        fill = array("i", counts[:n])
+        for u, v, r in zip(src, dst, rel):
+            slot = fill[u]
+            indices[slot] = v
+            csr_rel[slot] = r
+            fill[u] = slot + 1
+        self._indptr, self._indices, self._csr_rel = counts, indices, csr_rel
+        self._csr_dirty = False
+
+    def successors(self, node_id) -> list:
+        if self._csr_dirty:
+            self._build_csr()
+        i = self._index[node_id]
+        if i + 1 >= len(self._indptr):
+            return []
+        ids = self._ids
+        out = []
+        for j in self._indices[self._indptr[i]:self._indptr[i + 1]]:
+            v = ids[j]
+            if v is not None:
+                out.append(v)
+        return out
+
+    def edges(self):
+        if self._csr_dirty:
+            self._build_csr()
+        ids = self._ids
+        relations = self._relations.values
+        for i in range(len(self._indptr) - 1):
+            u = ids[i]
+            if u is None:
+                continue
+            for j in range(self._indptr[i], self._indptr[i + 1]):
+                v = ids[self._indices[j]]
+                if v is not None:
+                    yield u, v, relations[self._csr_rel[j]]
+
+    def to_networkx(self):
+        """A networkx copy of the graph, built on demand."""
+        g = nx.DiGraph()
+        g.add_nodes_from(self.nodes())
+        g.add_edges_from((u, v, {"relation": r}) for u, v, r in self.edges())
+        return g
+
+
+class ReferenceTable:
+    """
+    Import and call references of each file, kept off the graph nodes for
+    CodeGraph.link(): one row per reference in array columns (kind, then
+    three strings interned through _Table), each file's rows contiguous.
+    Import rows are (module, name, alias); call rows are (caller, name,
+    receiver), caller being the calling definition's name, or "" at module
+    level. Re-adding or removing a file abandons its rows; they are
+    compacted away once they outnumber the live ones.
+    """
+
+    IMPORT, CALL = 0, 1
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._strings = _Table()
+        self._kind = array("b")
+        self._cols = (array("i"), array("i"), array("i"))
+        self._blocks = {}  # filename -> (start, end) of its rows
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._kind) - self._dead
+
+    def set(self, filename: str, imports, calls):
+        """Replace the file's references."""
+        self.remove(filename)
+        start = len(self._kind)
+        code = self._strings.code
+        a, b, c = self._cols
+        for kind, rows in ((self.IMPORT, imports), (self.CALL, calls)):
+            for x, y, z in rows:
+                self._kind.append(kind)
+                a.append(code(x))
+                b.append(code(y))
+                c.append(code(z))
+        if len(self._kind) > start:
+            self._blocks[filename] = (start, len(self._kind))
+
+    def remove(self, filename: str):
+        block = self._blocks.pop(filename, None)
+        if block is None:
+            return
+        self._dead += block[1] - block[0]
+        if self._dead > len(self):
+            self._compact()
+
+    def _compact(self):
+        kind = array("b")
+        cols = (array("i"), array("i"), array("i"))
+        blocks = {}
+        for filename, (start, end) in self._blocks.items():
+            blocks[filename] = (len(kind), len(kind) + end - start)
+            kind.extend(self._kind[start:end])
+            for new, old in zip(cols, self._cols):
+                new.extend(old[start:end])
+        self._kind, self._cols, self._blocks, self._dead = kind, cols, blocks, 0
+
+    def rows(self, filename: str):
+        """(kind, x, y, z) of each of the file's references, in the order set."""
+        start, end = self._blocks.get(filename, (0, 0))
+        values = self._strings.values
+        kind = self._kind
+        a, b, c = self._cols
+        for i in range(start, end):
+            yield kind[i], values[a[i]], values[b[i]], values[c[i]]
+
+    def to_state(self) -> tuple:
+        """The live rows as plain marshal-able data."""
+        if self._dead:
+            self._compact()
+        return (self._strings.values, self._kind.tobytes(),
+                [col.tobytes() for col in self._cols], self._blocks)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "ReferenceTable":
+        values, kind, cols, blocks = state
+        table = cls()
+        table._strings.values = list(values)
+        table._strings.codes = {v: i for i, v in enumerate(values)}
+        table._kind.frombytes(kind)
+        for col, data in zip(table._cols, cols):
+            col.frombytes(data)
+        table._blocks = dict(blocks)
+        return table
+
+
+BACKENDS = {
+    "networkx": NetworkXBackend,
+    "compact": CompactBackend,
+}
@@ -0,0 +1,118 @@
+"""
+graph_cache.py — On-disk cache of built CodeGraphs keyed by repo URL + commit.
+"""
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+from graph_engine import CodeGraph, GRAPH_FORMAT_VERSION
+from retrieval import BM25Index, get_index, set_index
+
+CACHE_DIR = Path(os.environ.get("REPOROVER_CACHE_DIR", Path.home() / ".cache" / "reporover"))
+CACHE_MAX_BYTES = int(os.environ.get("REPOROVER_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# File layout: magic, format version, python major/minor (marshal is
+# version-specific), lengths of the info block and the graph bytes, info
+# block, graph bytes, then the graph's BM25 index (zlib-compressed
+# marshal) so a hit doesn't rebuild it.
+_MAGIC = b"RRGC"
+_HEADER = struct.Struct("<4sHBBII")
+_STAMP = (GRAPH_FORMAT_VERSION, sys.version_info[0], sys.version_info[1])
+_SUFFIX = ".rrg"
+
+
+class GraphCache:
+    """
+    A directory of serialized graphs, one file per (url, commit).
+    Hits refresh the file's mtime; writes evict the least recently used
+    entries until the directory fits in max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, url: str, commit: str) -> Path:
+        digest = hashlib.sha256(f"{url}\n{commit}".encode("utf8")).hexdigest()
+        return self.directory / f"{digest}{_SUFFIX}"
+
+    def get(self, url: str, commit: str):
+        """Return (graph, info) for a cached build, or None on a miss."""
+        path = self._path(url, commit)
+        try:
+            with open(path, "rb") as f:
+                magic, version, py_major, py_minor, info_len, graph_len = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or (version, py_major, py_minor) != _STAMP:
+                    raise ValueError("stale cache entry")
+                info = marshal.loads(f.read(info_len))
+                graph = CodeGraph.from_bytes(f.read(graph_len))
+                set_index(graph, BM25Index.from_state(marshal.loads(zlib.decompress(f.read())), graph))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated, corrupt or written by another format version
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)
+        return graph, info
+
+    def put(self, url: str, commit: str, graph: CodeGraph, info: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        info_bytes = marshal.dumps(info)
+        graph_bytes = graph.to_bytes()
+        index_bytes = zlib.compress(marshal.dumps(get_index(graph).to_state()), 1)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, *_STAMP, len(info_bytes), len(graph_bytes)))
+                f.write(info_bytes)
+                f.write(graph_bytes)
+                f.write(index_bytes)
+            os.replace(tmp, self._path(url, commit))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            path.unlink(missing_ok=True)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Shared cache for the app; None when disabled via REPOROVER_CACHE=0."""
+    global _default_cache
+    if os.environ.get("REPOROVER_CACHE", "1") == "0":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GraphCache()
+        return _default_cache
@@ -1,112 +1,625 @@
-
-import networkx as nx
+"""
+graph_engine.py — CodeGraph: files, code entities and the edges between them.
+"""
+import functools
+import marshal
+import os
+import threading
+import zlib
+from collections import defaultdict
 from pathlib import Path
-from step1_parser import get_function_and_class_chunks
+from step1_parser import parse_file
+from chunkers import chunk_file, register_chunker  # noqa: F401 (re-exported)
+from content_store import ContentStore
+from graph_backends import BACKENDS, ReferenceTable
+from context_builder import DEFAULT_TOKEN_BUDGET, build_repo_map
+
+# Bump whenever node attributes or parser output change shape, so serialized
+# graphs (see graph_cache.py) written by older code are discarded.
+GRAPH_FORMAT_VERSION = 7
+
+# "networkx" or "compact" (array columns + CSR, for very large repos)
+DEFAULT_BACKEND = os.environ.get("REPOROVER_GRAPH_BACKEND", "networkx")
+
+# Edges derived from imports and calls by CodeGraph.link(); rebuilt, never persisted as truth
+REFERENCE_RELATIONS = frozenset({"IMPORTS", "CALLS"})
+
+# Methods of builtin and stdlib types. obj.<name>() with an unknown obj is
+# far more likely one of these than the repo's only definition of <name>.
+COMMON_METHOD_NAMES = frozenset({
+    # str / bytes
+    "capitalize", "count", "decode", "encode", "endswith", "find", "format", "index", "join",
+    "lower", "lstrip", "partition", "replace", "rfind", "rsplit", "rstrip", "split",
+    "splitlines", "startswith", "strip", "title", "upper",
+    # list / dict / set
+    "add", "append", "clear", "copy", "difference", "discard", "extend", "get", "insert",
+    "intersection", "items", "keys", "pop", "popitem", "remove", "reverse", "setdefault",
+    "sort", "union", "update", "values",
+    # files, sockets, processes
+    "close", "fileno", "flush", "read", "readline", "readlines", "recv", "seek", "send",
+    "tell", "write", "writelines", "communicate", "kill", "poll", "terminate",
+    # re
+    "findall", "finditer", "fullmatch", "group", "groupdict", "groups", "match", "search", "sub",
+    # threading / concurrent.futures / queue
+    "acquire", "cancel", "done", "exception", "get_nowait", "is_set", "join", "map", "notify",
+    "notify_all", "put", "put_nowait", "release", "result", "run", "set", "shutdown", "start",
+    "submit", "wait",
+    # pathlib / os
+    "exists", "glob", "is_dir", "is_file", "iterdir", "mkdir", "open", "read_bytes", "read_text",
+    "resolve", "rglob", "stat", "unlink", "write_bytes", "write_text",
+    # sqlite3 / logging / misc
+    "commit", "cursor", "execute", "executemany", "fetchall", "fetchone", "rollback",
+    "debug", "error", "info", "warning", "dumps", "loads", "hexdigest", "total_seconds",
+})
+
+# Chunks of JS/TS code are typed like Python definitions so ranking and
+# context treat them the same; all other chunks are type "chunk"
+CHUNK_ENTITY_TYPES = {"function": "function_definition", "class": "class_definition"}
+
+
+def _locked(method):
+    """Run the method under the graph's lock, so readers never see a half-applied write."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class CodeGraph:
-    def __init__(self):
-        self.graph = nx.DiGraph()
+    """
+    Files and the code entities they define. Safe to query from other
+    threads while a loader is still adding files: public methods take
+    `lock`, and `indexed_fraction` tells how much of the repo is in so far.
+    """
+
+    def __init__(self, backend: str = None):
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown graph backend {self.backend!r}; choose from {sorted(BACKENDS)}")
+        self._store = BACKENDS[self.backend]()
+        self.commit = None  # git commit the graph was built from, if known
+        self.version = 0    # bumped on every mutation so derived indexes know to rebuild
+        self.lock = threading.RLock()
+        # Set by a loader while it is still adding files; None once complete
+        self.expected_files = None
+        self.processed_files = 0
+        # Imports and call sites recorded by add_file(), resolved by link()
+        self._references = ReferenceTable()
+        # IMPORTS/CALLS adjacency from the last link(), both directions
+        self._linked_version = -1
+        self._linked_files = set()           # files whose references are resolved
+        self._refs_out = defaultdict(list)   # node_id -> [(node_id, relation)]
+        self._refs_in = defaultdict(list)
+        # Entity text lives out of the graph; nodes keep (offset, length) into it
+        self.content = ContentStore()
+        self._reset_indexes()
+
+    # ── Indexes ────────────────────────────────────────────────────────────────
+    # Every node goes through _add_node/_remove_nodes so the query helpers can
+    # answer from these buckets instead of scanning the whole graph. Buckets
+    # are insertion-ordered dicts used as ordered sets, so results come back
+    # in graph order.
+
+    def _reset_indexes(self):
+        self._by_type = defaultdict(dict)    # node_type -> {node_id: None}
+        self._by_kind = defaultdict(dict)    # entity type -> {node_id: None}
+        self._seq = {}                       # node_id -> insertion number
+        self._next_seq = 0
+        self._name_ids = defaultdict(dict)   # lowercased entity name -> {node_id: None}
+        self._by_file = defaultdict(dict)    # filename -> {entity node_id: None}
+        self._trigrams = defaultdict(set)    # trigram -> lowercased names containing it
+
+    def _add_node(self, node_id: str, **attrs):
+        self.version += 1
+        existing = self._store.get(node_id)
+        if existing is not None:
+            if all(existing.get(k) == attrs.get(k) for k in ("node_type", "type", "name")):
+                # Same entity redefined (e.g. two methods sharing a name):
+                # indexes already point at it, only the attributes change.
+                self._store.add_node(node_id, attrs)
+                return
+            self._unindex_entity(node_id, existing)
+            self._by_type[existing.get("node_type")].pop(node_id, None)
+        else:
+            self._seq[node_id] = self._next_seq
+            self._next_seq += 1
+
+        self._store.add_node(node_id, attrs)
+        self._index_node(node_id, attrs)
+
+    def _index_node(self, node_id: str, attrs: dict):
+        self._by_type[attrs.get("node_type")][node_id] = None
+        if attrs.get("node_type") == "code_entity":
+            self._by_kind[attrs.get("type")][node_id] = None
+            self._by_file[attrs.get("filename")][node_id] = None
+            name = attrs.get("name", "").lower()
+            if name not in self._name_ids:
+                for i in range(len(name) - 2):
+                    self._trigrams[name[i:i + 3]].add(name)
+            self._name_ids[name][node_id] = None
+
+    def _unindex_entity(self, node_id: str, attrs: dict):
+        if attrs.get("node_type") != "code_entity":
+            return
+        self._by_kind[attrs.get("type")].pop(node_id, None)
+        entities = self._by_file.get(attrs.get("filename"))
+        if entities is not None:
+            entities.pop(node_id, None)
+            if not entities:
+                del self._by_file[attrs.get("filename")]
+        name = attrs.get("name", "").lower()
+        ids = self._name_ids.get(name)
+        if ids is not None:
+            ids.pop(node_id, None)
+            if not ids:
+                del self._name_ids[name]
+                for i in range(len(name) - 2):
+                    names = self._trigrams[name[i:i + 3]]
+                    names.discard(name)
+                    if not names:
+                        del self._trigrams[name[i:i + 3]]
+
+    def _remove_nodes(self, node_ids):
+        self.version += 1
+        for node_id in node_ids:
+            attrs = self._store.get(node_id)
+            self._unindex_entity(node_id, attrs)
+            self._by_type[attrs.get("node_type")].pop(node_id, None)
+            self._seq.pop(node_id, None)
+        self._store.remove_nodes(node_ids)
+        self._linked_version = -1  # edges to removed nodes: next link() starts over
+
+    @_locked
+    def add_file(self, filename: str, code_source: str, spans=None, parsed=None):
+        """
+        Parse a file and add its nodes/edges to the graph.
+        `parsed` may carry parse_file() output computed elsewhere (e.g. in a
+        worker process), or `spans` just its definitions; Python files are
+        only parsed here when both are None. Imports and call sites go to
+        the reference table for link(), not onto the nodes.
+        Other files are split by chunkers.chunk_file() (or take `parsed` as
+        its precomputed chunk list) into one entity per chunk; short files
+        stay a single "<raw>" entity.
+        """
+        data = code_source.encode("utf8")
+        if filename.endswith(".py"):
+            if parsed is None and spans is None:
+                parsed = parse_file(data)
+            if parsed is not None:
+                spans = parsed.spans
+                self._references.set(
+                    filename,
+                    parsed.imports,
+                    [(spans[c.caller].name if c.caller >= 0 else "", c.name, c.receiver) for c in parsed.calls],
+                )
+            else:
+                self._references.remove(filename)
+        else:
+            self._references.remove(filename)
 
-    def add_file(self, filename: str, code_source: str):
-        """Parse a file and add its nodes/edges to the graph."""
         # Add File node
-        self.graph.add_node(filename, node_type="file", name=filename)
+        self._add_node(filename, node_type="file", name=filename)
+        base = self.content.add(data)
 
         if filename.endswith(".py"):
-            chunks = get_function_and_class_chunks(code_source, filename)
-            for chunk in chunks:
-                entity_id = f"{filename}::{chunk.metadata['name']}"
-                self.graph.add_node(
+            for span in spans:
+                entity_id = f"{filename}::{span.name}"
+                self._add_node(
                     entity_id,
                     node_type="code_entity",
-                    name=chunk.metadata["name"],
-                    type=chunk.metadata["type"],
-                    content=chunk.page_content,
-                    start_line=chunk.metadata["start_line"],
+                    name=span.name,
+                    type=span.kind,
+                    offset=base + span.start_byte,
+                    length=span.end_byte - span.start_byte,
+                    start_line=span.start_line,
+                    end_line=span.end_line,
                     filename=filename,
                 )
-                self.graph.add_edge(filename, entity_id, relation="DEFINES")
-            return len(chunks)
-        else:
-            # Non-Python: add raw content as a single entity
+                self._store.add_edge(filename, entity_id, "DEFINES")
+            return len(spans)
+
+        chunks = parsed if parsed is not None else chunk_file(filename, code_source)
+        if not chunks:
+            # Short non-Python file: add raw content as a single entity
             entity_id = f"{filename}::<raw>"
-            self.graph.add_node(
+            self._add_node(
                 entity_id,
                 node_type="code_entity",
                 name="<raw>",
                 type="raw_file",
-                content=code_source,
+                offset=base,
+                length=len(data),
                 start_line=0,
                 filename=filename,
             )
-            self.graph.add_edge(filename, entity_id, relation="DEFINES")
+            self._store.add_edge(filename, entity_id, "DEFINES")
             return 1
 
+        # Byte offset where each line starts, to turn chunk line ranges into content slices
+        line_starts = [0]
+        pos = data.find(b"\n")
+        while pos != -1:
+            line_starts.append(pos + 1)
+            pos = data.find(b"\n", pos + 1)
+        line_starts.append(len(data))
+        for chunk in chunks:
+            start = line_starts[min(chunk.start_line, len(line_starts) - 1)]
+            end = line_starts[min(chunk.end_line + 1, len(line_starts) - 1)]
+            entity_id = f"{filename}::{chunk.name}"
+            self._add_node(
+                entity_id,
+                node_type="code_entity",
+                name=chunk.name,
+                type=CHUNK_ENTITY_TYPES.get(chunk.kind, "chunk"),
+                chunk_kind=chunk.kind,
+                offset=base + start,
+                length=end - start,
+                start_line=chunk.start_line,
+                end_line=chunk.end_line,
+                filename=filename,
+            )
+            self._store.add_edge(filename, entity_id, "DEFINES")
+        return len(chunks)
+
+    @_locked
+    def add_summary(self, filename: str, summary: str, category: str):
+        """
+        Add a file that is indexed by a short summary only (lockfiles,
+        minified bundles, generated code, data dumps; see file_classifier).
+        """
+        self._add_node(filename, node_type="file", name=filename)
+        data = summary.encode("utf8")
+        entity_id = f"{filename}::<summary>"
+        self._add_node(
+            entity_id,
+            node_type="code_entity",
+            name="<summary>",
+            type="file_summary",
+            category=category,
+            offset=self.content.add(data),
+            length=len(data),
+            start_line=0,
+            filename=filename,
+        )
+        self._store.add_edge(filename, entity_id, "DEFINES")
+        return 1
+
+    def get_content(self, entity: dict) -> str:
+        """Source text of an entity, read from the content store on demand."""
+        return self.content.read(entity.get("offset", 0), entity.get("length", 0))
+
+    @_locked
+    def remove_file(self, filename: str) -> int:
+        """Drop a file node and the entities it defines. Returns nodes removed."""
+        if filename not in self._store:
+            return 0
+        doomed = list(self._by_file.get(filename, ()))
+        doomed.append(filename)
+        self._remove_nodes(doomed)
+        self._references.remove(filename)
+        return len(doomed)
+
+    @_locked
     def clear(self):
-        self.graph.clear()
+        self._linked_version = -1
+        self._refs_out.clear()
+        self._refs_in.clear()
+        self._references.clear()
+        self._store.clear()
+        self.version += 1
+        self.content.close()
+        self.content = ContentStore()
+        self._reset_indexes()
+
+    @property
+    def complete(self) -> bool:
+        return self.expected_files is None
+
+    @property
+    def indexed_fraction(self) -> float:
+        """Share of the repo's files processed so far (1.0 once loading finished)."""
+        if self.expected_files is None:
+            return 1.0
+        return min(1.0, self.processed_files / self.expected_files) if self.expected_files else 0.0
+
+    # ── Imports and calls ──────────────────────────────────────────────────────
+
+    @_locked
+    def link(self):
+        """
+        Resolve the recorded imports and call sites into IMPORTS edges (file
+        to file or imported entity) and CALLS edges (caller to callee) via
+        a symbol table of the graph's modules and entities. Best effort:
+        calls are resolved by same-file definitions, imported names and
+        module aliases, and method calls on other objects by a repo-wide
+        name that is defined only once.
+        Runs again only after the graph has changed. While a load is still
+        running (files are only added), only the files added since the last
+        link are resolved; references to them from earlier files are found
+        by the full link once the graph is complete.
+        """
+        if self._linked_version == self.version:
+            return
+        store = self._store
+        py_files = [f for f in self._by_type["file"] if f.endswith(".py")]
+        if self.complete or self._linked_version < 0:
+            store.remove_edges(REFERENCE_RELATIONS)
+            self._refs_out.clear()
+            self._refs_in.clear()
+            self._linked_files.clear()
+        files = [f for f in py_files if f not in self._linked_files]
+
+        # Symbol table: dotted module name -> file. Full paths first, then
+        # shorter suffixes (src/ layouts), shallowest file winning a clash.
+        module_parts = {}
+        for f in py_files:
+            parts = f[:-3].split("/")
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            module_parts[f] = parts
+        modules = {".".join(parts): f for f, parts in module_parts.items() if parts}
+        for f, parts in sorted(module_parts.items(), key=lambda item: len(item[1])):
+            for i in range(1, len(parts)):
+                modules.setdefault(".".join(parts[i:]), f)
+
+        def resolve_module(module, importer):
+            if module.startswith("."):
+                level = len(module) - len(module.lstrip("."))
+                package = importer.split("/")[:-1]
+                if level > 1:
+                    package = package[:-(level - 1)] if level - 1 <= len(package) else None
+                if package is None:
+                    return None
+                rest = module.lstrip(".")
+                module = ".".join(package + ([rest] if rest else []))
+            return modules.get(module)
+
+        def add(u, v, relation):
+            if u == v or v not in store:
+                return
+            store.add_edge(u, v, relation)
+            self._refs_out[u].append((v, relation))
+            self._refs_in[v].append((u, relation))
+
+        def unique(name):
+            ids = [n for n in self._name_ids.get(name.lower(), ()) if n.endswith("::" + name)]
+            return ids[0] if len(ids) == 1 else None
+
+        table = self._references
+        for f in files:
+            imports, calls = [], defaultdict(list)  # caller id -> [(name, receiver)]
+            for kind, x, y, z in table.rows(f):
+                if kind == table.IMPORT:
+                    imports.append((x, y, z))
+                else:
+                    calls[f"{f}::{x}" if x else f].append((y, z))
+            imported = {}    # alias -> (file, name or "")
+            external = set()  # aliases of modules outside the repo
+            for module, name, alias in imports:
+                target = None
+                if name:
+                    base = module if module.endswith(".") else module + "."
+                    target = resolve_module(base + name, f)
+                    if target is None:
+                        source = resolve_module(module, f)
+                        if source is not None:
+                            target = f"{source}::{name}" if f"{source}::{name}" in store else source
+                            imported[alias] = (source, name)
+                    else:
+                        imported[alias] = (target, "")
+                else:
+                    target = resolve_module(module, f)
+                    if target is not None:
+                        imported[alias] = (target, "")
+                if target is not None:
+                    add(f, target, "IMPORTS")
+                else:
+                    external.add(alias)
+
+            own = f + "::"
+            for caller, sites in calls.items():
+                for name, receiver in sites:
+                    target = None
+                    if receiver.split(".")[0] in external:
+                        continue  # e.g. os.path.join()
+                    if receiver in ("", "self", "cls"):
+                        if f"{f}::{name}" in store:
+                            target = f"{f}::{name}"
+                        elif receiver == "" and name in imported and imported[name][1]:
+                            source, original = imported[name]
+                            target = f"{source}::{original}"
+                    elif receiver in imported and not imported[receiver][1]:
+                        target = f"{imported[receiver][0]}::{name}"
+                    if target is None and receiver and name not in COMMON_METHOD_NAMES:
+                        # obj.method(): the type of obj is unknown, so only a
+                        # repo-wide unique name is trusted, and not one that
+                        # builtin and stdlib objects have too (text.count(),
+                        # future.result()). Bare names must be local or
+                        # imported to be repo code.
+                        target = unique(name)
+                    # A file already DEFINES its own entities
+                    if target is not None and not (caller == f and target.startswith(own)):
+                        add(caller, target, "CALLS")
+
+        self._linked_files.update(files)
+        self._linked_version = self.version
+
+    @_locked
+    def get_neighborhood(self, node_ids, hops: int = 1, max_nodes: int = 50) -> list[tuple[str, int, str]]:
+        """
+        Nodes within `hops` IMPORTS/CALLS edges of `node_ids`, in either
+        direction, nearest first, as (node_id, hop, how it is related).
+        The seeds themselves are not included.
+        """
+        self.link()
+        seen = set(node_ids)
+        frontier = list(node_ids)
+        out = []
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for node_id in frontier:
+                attrs = self._store.get(node_id)
+                if attrs is None:
+                    continue
+                name = attrs.get("name", node_id)
+                related = [(v, f"{'called' if r == 'CALLS' else 'imported'} by {name}")
+                           for v, r in self._refs_out.get(node_id, ())]
+                related += [(u, f"{'calls' if r == 'CALLS' else 'imports'} {name}")
+                            for u, r in self._refs_in.get(node_id, ())]
+                for other, how in related:
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    out.append((other, hop, how))
+                    next_frontier.append(other)
+                    if len(out) >= max_nodes:
+                        return out
+            frontier = next_frontier
+        return out
+
+    # ── Serialization ──────────────────────────────────────────────────────────
+
+    @_locked
+    def to_bytes(self) -> bytes:
+        """
+        Encode the graph as zlib-compressed marshal data of plain tuples,
+        content store bytes included, and whether link() is up to date.
+        Only the content entities point into is kept, so a copy() made to
+        update a graph does not carry the bodies of files it replaced.
+        Only pair with from_bytes() of the same GRAPH_FORMAT_VERSION.
+        """
+        nodes = list(self._store.nodes())
+        content, moved = self.content.live_bytes(
+            (d["offset"], d.get("length", 0)) for _, d in nodes if "offset" in d)
+        payload = (
+            self.commit,
+            content,
+            [(n, {**d, "offset": moved[d["offset"]]} if "offset" in d else d) for n, d in nodes],
+            list(self._store.edges()),
+            self._references.to_state(),
+            self._linked_version == self.version,
+        )
+        return zlib.compress(marshal.dumps(payload), 1)
+
+    def copy(self) -> "CodeGraph":
+        """An independent copy (same backend), e.g. to update without touching a shared graph."""
+        return CodeGraph.from_bytes(self.to_bytes(), self.backend)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, backend: str = None) -> "CodeGraph":
+        """
+        Decode to_bytes() output. Nodes and edges go to the store in bulk
+        and the indexes are filled straight from them; a graph that was
+        linked comes back linked, its adjacency taken from the edges.
+        """
+        commit, content, nodes, edges, references, linked = marshal.loads(zlib.decompress(data))
+        graph = cls(backend)
+        graph.commit = commit
+        graph.content.close()
+        graph.content = ContentStore.from_bytes(content)
+        graph._store.add_nodes_from(nodes)
+        graph._store.add_edges_from(edges)
+        graph._references = ReferenceTable.from_state(references)
+        for seq, (node_id, attrs) in enumerate(nodes):
+            graph._seq[node_id] = seq
+            graph._index_node(node_id, attrs)
+        graph._next_seq = len(nodes)
+        graph.version += 1
+        if linked:
+            for u, v, r in edges:
+                if r in REFERENCE_RELATIONS:
+                    graph._refs_out[u].append((v, r))
+                    graph._refs_in[v].append((u, r))
+            graph._linked_files.update(f for f in graph._by_type["file"] if f.endswith(".py"))
+            graph._linked_version = graph.version
+        return graph
 
     # ── Query helpers ──────────────────────────────────────────────────────────
 
+    @_locked
     def get_all_files(self):
-        return [n for n, d in self.graph.nodes(data=True) if d.get("node_type") == "file"]
+        return list(self._by_type["file"])
 
+    @_locked
     def get_entities_in_file(self, filename: str):
-        return [
-            self.graph.nodes[n]
-            for n in self.graph.successors(filename)
-            if self.graph.nodes[n].get("node_type") == "code_entity"
-        ]
+        get = self._store.get
+        return [get(n) for n in self._by_file.get(filename, ())]
+
+    @property
+    def graph(self):
+        """
+        The graph as an nx.DiGraph: the live one for the networkx backend,
+        a copy built on demand for the compact backend. The live graph is
+        not guarded by `lock`, so hold `lock` while using it if a load is
+        still running.
+        """
+        return self._store.to_networkx()
+
+    @_locked
+    def get_node(self, node_id: str):
+        """Attribute dict of a node, or None."""
+        return self._store.get(node_id)
+
+    @_locked
+    def get_entity_ids(self):
+        return list(self._by_type["code_entity"])
 
+    @_locked
     def get_all_entities(self):
-        return [
-            d for _, d in self.graph.nodes(data=True)
-            if d.get("node_type") == "code_entity"
-        ]
+        get = self._store.get
+        return [get(n) for n in self._by_type["code_entity"]]
 
+    @_locked
     def get_functions(self):
-        return [e for e in self.get_all_entities() if e.get("type") == "function_definition"]
+        get = self._store.get
+        return [get(n) for n in self._by_kind["function_definition"]]
 
+    @_locked
     def get_classes(self):
-        return [e for e in self.get_all_entities() if e.get("type") == "class_definition"]
+        get = self._store.get
+        return [get(n) for n in self._by_kind["class_definition"]]
 
+    @_locked
     def search_by_name(self, name: str):
+        """
+        Entities whose name contains `name` (case-insensitive), in graph order.
+        Queries of 3+ characters only look at names sharing all of the query's
+        trigrams, so the cost follows the number of matches, not the graph size.
+        """
         name_lower = name.lower()
-        return [
-            d for _, d in self.graph.nodes(data=True)
-            if d.get("node_type") == "code_entity"
-            and name_lower in d.get("name", "").lower()
+        if len(name_lower) >= 3:
+            candidate_sets = []
+            for i in range(len(name_lower) - 2):
+                names = self._trigrams.get(name_lower[i:i + 3])
+                if not names:
+                    return []
+                candidate_sets.append(names)
+            candidate_sets.sort(key=len)
+            candidates = candidate_sets[0].intersection(*candidate_sets[1:])
+        else:
+            candidates = self._name_ids.keys()
+
+        ids = [
+            node_id
+            for n in candidates if name_lower in n
+            for node_id in self._name_ids[n]
         ]
+        ids.sort(key=self._seq.__getitem__)
+        get = self._store.get
+        return [get(n) for n in ids]
 
+    @_locked
     def get_stats(self):
-        entities = self.get_all_entities()
         return {
-            "files": len(self.get_all_files()),
-            "functions": sum(1 for e in entities if e.get("type") == "function_definition"),
-            "classes": sum(1 for e in entities if e.get("type") == "class_definition"),
-            "total_entities": len(entities),
+            "files": len(self._by_type["file"]),
+            "functions": len(self._by_kind["function_definition"]),
+            "classes": len(self._by_kind["class_definition"]),
+            "total_entities": len(self._by_type["code_entity"]),
         }
 
-    def to_context_string(self, max_entities: int = 60) -> str:
+    def to_context_string(self, max_entities: int = 60, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
         """
         Serialize graph data into a compact string for the LLM context window.
         """
-        lines = []
-        for filename in self.get_all_files():
-            entities = self.get_entities_in_file(filename)
-            if not entities:
-                continue
-            lines.append(f"\n📄 FILE: {filename}")
-            for e in entities:
-                t = e.get("type")
-                kind = "class" if t == "class_definition" else "function" if t == "function_definition" else "file"
-                lines.append(f"  [{kind}] {e['name']}  (line {e.get('start_line', '?')})")
-                # Include first 3 lines of content as a hint
-                preview = "\n".join(e["content"].splitlines()[:3])
-                lines.append(f"    {preview}")
-
-            if len(lines) > max_entities * 4:
-                lines.append("  ... (truncated for brevity)")
-                break
-
-        return "\n".join(lines)
+        return build_repo_map(self, token_budget, preview_lines=3, max_entities=max_entities).render()
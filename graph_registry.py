@@ -0,0 +1,248 @@
+"""
+graph_registry.py — Process-wide registry of loaded graphs shared by sessions.
+
+Sessions acquire a reference-counted GraphHandle per (repo, commit) instead
+of each building its own CodeGraph. Concurrent requests for the same repo
+wait on the one in-flight load, and graphs nobody holds are evicted least
+recently used first once the estimated total exceeds the memory budget.
+Shared graphs are read-only: to move to a newer commit, acquire it again.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+
+from repo_loader import LoadCancelled, _resolve_commit, clone_and_build_graph, parse_repo_url
+
+REGISTRY_MAX_BYTES = int(os.environ.get("REPOROVER_REGISTRY_MAX_MB", "1024")) * 1024 * 1024
+
+# Approximate heap bytes per graph node, including its share of the BM25
+# index once built (measured with tracemalloc on a mid-sized repo)
+NODE_BYTES = {"networkx": 1700, "compact": 800}
+
+
+def estimate_graph_bytes(graph) -> int:
+    """Rough memory footprint of a graph: its nodes plus its content store."""
+    per_node = NODE_BYTES.get(graph.backend, max(NODE_BYTES.values()))
+    return len(graph._store) * per_node + len(graph.content)
+
+
+class _Entry:
+    __slots__ = ("key", "graph", "info", "size", "refs", "last_used")
+
+    def __init__(self, key, graph, info, refs):
+        self.key = key
+        self.graph = graph
+        self.info = info
+        self.size = estimate_graph_bytes(graph)
+        self.refs = refs
+        self.last_used = time.time()
+
+
+class GraphHandle:
+    """
+    A session's reference to a shared graph. Call release() (or use it as a
+    context manager) when done; a handle that is garbage collected without
+    being released releases itself.
+    """
+
+    def __init__(self, registry, entry: _Entry):
+        self.graph = entry.graph
+        self.info = entry.info
+        self.key = entry.key
+        self._release = weakref.finalize(self, registry._release, entry)
+
+    @property
+    def released(self) -> bool:
+        return not self._release.alive
+
+    def release(self):
+        self._release()  # runs at most once
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class _Load:
+    """An in-flight load and the sessions waiting for it."""
+    __slots__ = ("future", "sessions", "cancel_event", "graph", "finished")
+
+    def __init__(self):
+        self.future = Future()
+        self.sessions = {}                      # token -> (progress_callback, on_graph)
+        self.cancel_event = threading.Event()   # set once no session wants the graph
+        self.graph = None                       # the graph being built, once parsing started
+        self.finished = False
+
+
+class GraphRegistry:
+    """
+    Graphs keyed by (normalized repo URL and path, commit). `loader` builds a graph
+    for a URL and returns (graph, info) like clone_and_build_graph; it is
+    also given the RepoSpec and commit already resolved here (spec=,
+    head=) so it need not ask the remote again.
+    """
+
+    def __init__(self, max_bytes: int = REGISTRY_MAX_BYTES, loader=clone_and_build_graph):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # key -> _Entry, least recently used first
+        self._inflight = {}            # key -> _Load
+        self._lock = threading.Lock()
+
+    def acquire(self, github_url: str, progress_callback=None, cancel_event=None, on_graph=None,
+                **load_kwargs) -> GraphHandle:
+        """
+        A handle on the graph of the URL's current commit (its ref, default
+        HEAD, and path; see parse_repo_url), loading it if no session holds
+        it yet. Raises whatever the loader raises. Every session waiting on
+        a load gets its progress messages and on_graph(graph) calls.
+        Setting `cancel_event` stops this session waiting (raising
+        LoadCancelled); the load itself is only stopped once every session
+        waiting on it has cancelled.
+        """
+        spec = parse_repo_url(github_url)
+        url = spec.cache_url
+        head = _resolve_commit(spec)
+        key = (url, head)
+        token = object()
+
+        with self._lock:
+            entry = self._entries.get(key) if head else None
+            if entry is not None:
+                entry.refs += 1
+                self._entries.move_to_end(key)
+                return GraphHandle(self, entry)
+            load = self._inflight.get(key)
+            # A load everyone gave up on is already stopping: start afresh
+            start = load is None or load.cancel_event.is_set()
+            if start:
+                load = self._inflight[key] = _Load()
+            load.sessions[token] = (progress_callback, on_graph)
+            graph = load.graph
+
+        if start:
+            load_kwargs.update(spec=spec, head=head)
+            threading.Thread(target=self._load, args=(key, load, github_url, load_kwargs),
+                             name="reporover-registry-load", daemon=True).start()
+        else:
+            if progress_callback:
+                progress_callback("⏳ Another session is loading this repository, waiting for it...")
+            if graph is not None and on_graph:
+                on_graph(graph)
+        return self._wait(load, token, cancel_event)
+
+    def _load(self, key, load: _Load, github_url: str, load_kwargs: dict):
+        """Run the loader on its own thread, so it outlives a session that stops waiting."""
+        def progress(message):
+            for callback, _ in list(load.sessions.values()):
+                if callback:
+                    callback(message)
+
+        def graph_started(graph):
+            load.graph = graph
+            for _, callback in list(load.sessions.values()):
+                if callback:
+                    callback(graph)
+
+        try:
+            graph, info = self.loader(github_url, progress_callback=progress, cancel_event=load.cancel_event,
+                                      on_graph=graph_started, **load_kwargs)
+        except BaseException as e:
+            with self._lock:
+                load.finished = True
+                if self._inflight.get(key) is load:
+                    del self._inflight[key]
+            load.future.set_exception(e)
+            return
+
+        with self._lock:
+            load.finished = True
+            if self._inflight.get(key) is load:
+                del self._inflight[key]
+            # Keyed by the commit actually built, in case HEAD moved or was unknown
+            entry_key = (key[0], info.get("commit") or key[1])
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                entry = _Entry(entry_key, graph, info, refs=0)
+                self._entries[entry_key] = entry
+            entry.refs += len(load.sessions)
+            self._entries.move_to_end(entry_key)
+            self._evict()
+        load.future.set_result(entry)
+
+    def _wait(self, load: _Load, token, cancel_event) -> GraphHandle:
+        future = load.future
+        while True:
+            try:
+                # The load's reference count includes every session still waiting
+                return GraphHandle(self, future.result(timeout=0.1))
+            except TimeoutError:
+                if cancel_event is None or not cancel_event.is_set():
+                    continue
+            with self._lock:
+                if not load.finished:
+                    del load.sessions[token]
+                    if not load.sessions:
+                        load.cancel_event.set()  # nobody else waits: kill the clone or stop parsing
+                    raise LoadCancelled("Load cancelled")
+            # Finished meanwhile and counted us: take the reference and drop it
+            try:
+                GraphHandle(self, future.result()).release()
+            except Exception:
+                pass
+            raise LoadCancelled("Load cancelled")
+
+    def _release(self, entry: _Entry):
+        with self._lock:
+            entry.refs -= 1
+            entry.last_used = time.time()
+            self._evict()
+
+    def _evict(self):
+        """Drop unreferenced graphs, oldest first, until under budget. Caller holds the lock."""
+        total = sum(e.size for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.refs <= 0:
+                del self._entries[key]
+                total -= entry.size
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "graphs": len(self._entries),
+                "bytes": sum(e.size for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "references": sum(e.refs for e in self._entries.values()),
+                "loading": len(self._inflight),
+            }
+
+    def clear(self):
+        """Forget unreferenced graphs."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.refs <= 0]:
+                del self._entries[key]
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry() -> GraphRegistry:
+    """The registry shared by every session in this process."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = GraphRegistry()
+        return _default_registry
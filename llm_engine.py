@@ -1,12 +1,35 @@
 """
 llm_engine.py — Answer questions about the code graph using Groq + LangChain.
 """
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from graph_engine import CodeGraph
+from answer_cache import answer_key, get_default_answer_cache
+from context_builder import (DEFAULT_TOKEN_BUDGET, ContextAssembler, build_ranked_context,
+                             build_repo_map, estimate_tokens)
+from retrieval import rank_entities
+from telemetry import NULL_TRACE, start_trace
+
+MODEL_NAME = "llama-3.3-70b-versatile"
+
+# Entities ranked for a question that matches something specific; the
+# first FULL_ENTITIES go in as full code, the rest as previews
+TOP_K_ENTITIES = 8
+FULL_ENTITIES = 3
+
+# Callers, callees and imports of the full entities added as signatures
+NEIGHBOR_HOPS = 1
+MAX_NEIGHBORS = 16
+
+# Chat clients kept alive (one per API key) so connections are reused
+MAX_POOLED_CLIENTS = 32
 
 SYSTEM_PROMPT = """You are RepoRover, an expert code analyst. You have been given a structured map of a codebase.
 
@@ -22,63 +45,161 @@ CODEBASE MAP:
 {context}
 """
 
-def answer_question(question: str, graph: CodeGraph, api_key: str) -> dict:
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", "{question}")
+])
+
+_clients = OrderedDict()  # sha256(api_key) -> ChatGroq, least recently used first
+_clients_lock = threading.Lock()
+
+
+def get_llm(api_key: str):
+    """The pooled chat client for this API key, created on first use."""
+    key = hashlib.sha256(api_key.encode("utf8")).hexdigest()
+    with _clients_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            llm = ChatGroq(api_key=api_key, model_name=MODEL_NAME, temperature=0)
+            _clients[key] = llm
+            while len(_clients) > MAX_POOLED_CLIENTS:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(key)
+        return llm
+
+
+class AnswerStream:
+    """
+    Iterate to receive the answer as text chunks while the model generates
+    it. Once iteration finishes, `result` holds the same dict that
+    answer_question() returns. A cached answer is yielded as a single chunk.
+    """
+
+    def __init__(self, question: str, graph: CodeGraph, api_key: str = None,
+                 token_budget: int = DEFAULT_TOKEN_BUDGET, llm=None,
+                 use_cache: bool = True, cache=None):
+        self.question = question
+        self.trace = start_trace("answer", commit=graph.commit)
+        self.started = time.perf_counter()
+        self.llm = llm if llm is not None else get_llm(api_key)
+        # Build context — smart routing for common question types
+        self.indexed_fraction = graph.indexed_fraction
+        self.assembled = _build_smart_context(question, graph, token_budget, self.trace)
+        self.context = self.assembled.render()
+        if self.indexed_fraction < 1.0:
+            self.context = (f"NOTE: the repository is still being indexed; only {self.indexed_fraction:.0%} "
+                            "of its files are in this map so far, so say when the answer may be incomplete.\n\n"
+                            + self.context)
+        self.result = None
+
+        # Answers from a partial graph are not worth keeping
+        use_cache = use_cache and self.indexed_fraction >= 1.0
+        self.cache = (cache or get_default_answer_cache()) if use_cache else None
+        self.cache_key = None
+        self.cached = None
+        if self.cache is not None:
+            with self.trace.span("cache_lookup"):
+                model = getattr(self.llm, "model_name", None) or type(self.llm).__name__
+                self.cache_key = answer_key(graph.commit, question, self.context, model)
+                self.cached = self.cache.get(self.cache_key)
+
+    def __iter__(self):
+        if self.cached is not None:
+            self.result = {**self.cached, "cache": "hit"}
+            yield self.result["answer"]
+            self._finish()
+            return
+
+        chain = PROMPT | self.llm
+        parts = []
+        usage = None
+        t0 = time.perf_counter()
+        for chunk in chain.stream({"context": self.context, "question": self.question}):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk.content:
+                if not parts:
+                    self.trace.add_time("llm_first_token", time.perf_counter() - t0)
+                parts.append(chunk.content)
+                yield chunk.content
+        self.trace.add_time("llm_total", time.perf_counter() - t0)
+
+        self.result = {
+            "answer": "".join(parts),
+            "context_length": len(self.context),
+            "context_tokens": self.assembled.used,
+            "token_budget": self.assembled.budget,
+            "context_detail": self.assembled.detail,
+            "indexed_fraction": self.indexed_fraction,
+        }
+        if self.trace.enabled:
+            if usage:
+                self.trace.count("prompt_tokens", usage.get("input_tokens", 0))
+                self.trace.count("completion_tokens", usage.get("output_tokens", 0))
+            else:
+                # Models that don't report usage: same estimate the budget uses
+                self.trace.count("prompt_tokens", estimate_tokens(SYSTEM_PROMPT + self.question) + self.assembled.used)
+                self.trace.count("completion_tokens", estimate_tokens(self.result["answer"]))
+        if self.cache is not None:
+            self.cache.put(self.cache_key, self.result)
+            self.result["cache"] = "miss"
+        else:
+            self.result["cache"] = "disabled"
+        self._finish()
+
+    def _finish(self):
+        """Attach this request's timings/counters to the result and export them."""
+        trace = self.trace
+        trace.add_time("total", time.perf_counter() - self.started)
+        trace.attrs["cache"] = self.result["cache"]
+        self.result["timings"] = trace.timings
+        self.result["counters"] = trace.counters
+        trace.export()
+
+
+def stream_answer(question: str, graph: CodeGraph, api_key: str = None,
+                  token_budget: int = DEFAULT_TOKEN_BUDGET, llm=None,
+                  use_cache: bool = True, cache=None) -> AnswerStream:
+    """
+    Streaming variant of answer_question(). `llm` overrides the pooled Groq
+    client with any LangChain chat model (e.g. a fake one in tests).
+    Answers are looked up in and stored to `cache` (default: the shared
+    AnswerCache) unless use_cache is False.
+    """
+    return AnswerStream(question, graph, api_key, token_budget, llm, use_cache, cache)
+
+
+def answer_question(question: str, graph: CodeGraph, api_key: str = None,
+                    token_budget: int = DEFAULT_TOKEN_BUDGET, llm=None,
+                    use_cache: bool = True, cache=None) -> dict:
     """
     Answer a natural language question about the codebase.
-    Returns dict with 'answer' and 'context_used'.
+    Returns dict with 'answer', 'context_length', how much of the context
+    token budget was used, 'cache' ("hit", "miss" or "disabled"), the share
+    of the repo indexed when it was asked ('indexed_fraction', below 1.0
+    while a load is still running) and the request's 'timings' and
+    'counters' (see telemetry.py).
     """
-    llm = ChatGroq(api_key=api_key, model_name="llama-3.3-70b-versatile", temperature=0)
-
-    # Build context — smart routing for common question types
-    context = _build_smart_context(question, graph)
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", SYSTEM_PROMPT),
-        ("human", "{question}")
-    ])
-
-    chain = prompt | llm
-    response = chain.invoke({"context": context, "question": question})
-
-    return {
-        "answer": response.content,
-        "context_length": len(context),
-    }
-
-
-def _build_smart_context(question: str, graph: CodeGraph) -> str:
-    q = question.lower()
-
-    # 1. Search by exact name first (most targeted)
-    words = [w for w in question.split() if len(w) > 3]
-    for word in words:
-        results = graph.search_by_name(word)
-        if results:
-            lines = [f"ENTITIES MATCHING '{word}':"]
-            for r in results:
-                t = r.get("type")
-                kind = "class" if t == "class_definition" else "function" if t == "function_definition" else "file"
-                lines.append(f"\n--- [{kind}] {r['name']} in {r['filename']} ---")
-                # Send the actual full code block, not just the first line!
-                lines.append(r['content'])
-            return "\n".join(lines)
-
-    # 2. Fallback: full graph context with larger previews
-    lines = []
-    for filename in graph.get_all_files():
-        entities = graph.get_entities_in_file(filename)
-        if not entities:
-            continue
-        lines.append(f"\n📄 FILE: {filename}")
-        for e in entities:
-            t = e.get("type")
-            kind = "class" if t == "class_definition" else "function" if t == "function_definition" else "file"
-            lines.append(f"  [{kind}] {e['name']}  (line {e.get('start_line', '?')})")
-            # Provide 10 lines instead of 3 so the AI can actually see methods
-            preview = "\n".join(e["content"].splitlines()[:10])
-            lines.append(f"    {preview}\n    ...")
-            
-    return "\n".join(lines)
-    
-    # Fallback: full graph context
-    return graph.to_context_string()
+    stream = stream_answer(question, graph, api_key, token_budget, llm, use_cache, cache)
+    for _ in stream:
+        pass
+    return stream.result
+
+
+def _build_smart_context(question: str, graph: CodeGraph,
+                         token_budget: int = DEFAULT_TOKEN_BUDGET, trace=NULL_TRACE) -> ContextAssembler:
+    # 1. Ranked lexical retrieval over entity names, paths and code
+    with trace.span("retrieval"):
+        results = rank_entities(graph, question, k=TOP_K_ENTITIES)
+    if results:
+        # 2. Their neighborhood in the call/import graph
+        with trace.span("expand"):
+            seeds = [f"{e['filename']}::{e['name']}" for e in results[:FULL_ENTITIES]]
+            related = graph.get_neighborhood(seeds, hops=NEIGHBOR_HOPS, max_nodes=MAX_NEIGHBORS)
+        with trace.span("context"):
+            return build_ranked_context(graph, results, token_budget, related, FULL_ENTITIES)
+
+    with trace.span("context"):
+        # 3. Fallback: repo map with larger previews (10 lines so the AI can
+        # actually see methods), degrading to signatures as the budget runs out
+        return build_repo_map(graph, token_budget, preview_lines=10)
@@ -0,0 +1,141 @@
+"""
+load_jobs.py — Run repository loads as background jobs.
+
+A LoadJobManager runs loads on a small thread pool and returns a LoadJob
+the UI polls for state and progress, so the script run is never blocked.
+Progress messages are coalesced to PROGRESS_HZ updates per second, and
+cancel() stops the job; the clone or parse workers are stopped too unless
+another session waits on the same load. While parsing runs,
+`graph` is the partially built graph, which can already be queried.
+"""
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from graph_registry import get_default_registry
+from repo_loader import LoadCancelled
+
+# Loads that may run at once in this process
+MAX_LOAD_JOBS = int(os.environ.get("REPOROVER_LOAD_JOBS", "2"))
+
+# Progress updates published per second
+PROGRESS_HZ = 5.0
+
+# Progress lines kept for display
+PROGRESS_LINES = 6
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class LoadJob:
+    """
+    One load. `state` moves from queued to running to done, failed or
+    cancelled; `handle` (a GraphHandle) is set when done and `error` when
+    failed. `messages` holds the latest progress lines and `graph` the graph
+    being built, once parsing has started.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, repo_url: str, rate_hz: float = PROGRESS_HZ):
+        self.id = next(self._ids)
+        self.repo_url = repo_url
+        self.state = QUEUED
+        self.handle = None
+        self.graph = None
+        self.error = None
+        self.messages = []
+        self.created = time.time()
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self._interval = 1.0 / rate_hz
+        self._last_publish = 0.0
+        self._latest = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.state in (QUEUED, RUNNING)
+
+    def cancel(self):
+        """Ask the job to stop; a queued job never starts (see GraphRegistry.acquire)."""
+        self.cancel_event.set()
+
+    def on_progress(self, message: str):
+        """Loader callback: keep the newest message, publish at most rate_hz times a second."""
+        now = time.monotonic()
+        with self._lock:
+            self._latest = message
+            if now - self._last_publish >= self._interval:
+                self._publish(now)
+
+    def on_graph(self, graph):
+        """Loader callback: the graph exists and is filling up."""
+        self.graph = graph
+
+    def _publish(self, now: float):
+        if self._latest is not None:
+            self.messages = (self.messages + [self._latest])[-PROGRESS_LINES:]
+            self._latest = None
+        self._last_publish = now
+
+    def _finish(self, state: str, handle=None, error=None):
+        with self._lock:
+            self._publish(time.monotonic())
+            self.handle = handle
+            self.graph = handle.graph if handle is not None else None
+            self.error = error
+            self.finished = time.time()
+            self.state = state
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"id": self.id, "repo_url": self.repo_url, "state": self.state,
+                    "messages": list(self.messages), "error": self.error,
+                    "elapsed": (self.finished or time.time()) - self.created}
+
+
+class LoadJobManager:
+    def __init__(self, max_workers: int = MAX_LOAD_JOBS, registry=None):
+        self.registry = registry or get_default_registry()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reporover-load")
+
+    def submit(self, repo_url: str, **load_kwargs) -> LoadJob:
+        """Start loading `repo_url` in the background and return its job."""
+        job = LoadJob(repo_url)
+        self._pool.submit(self._run, job, load_kwargs)
+        return job
+
+    def _run(self, job: LoadJob, load_kwargs: dict):
+        if job.cancel_event.is_set():
+            job._finish(CANCELLED)
+            return
+        job.state = RUNNING
+        try:
+            handle = self.registry.acquire(job.repo_url, progress_callback=job.on_progress,
+                                           cancel_event=job.cancel_event, on_graph=job.on_graph,
+                                           **load_kwargs)
+        except LoadCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job._finish(FAILED, error=str(e))
+        else:
+            if job.cancel_event.is_set():
+                handle.release()
+                job._finish(CANCELLED)
+            else:
+                job._finish(DONE, handle=handle)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_default_job_manager() -> LoadJobManager:
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = LoadJobManager()
+        return _default_manager
@@ -0,0 +1,177 @@
+"""
+parse_cache.py — Parse results of Python files keyed by git blob SHA.
+
+Forks, mirrors and successive commits of a project share most files
+byte-for-byte, so a file's parse_file() output is stored under its blob SHA
+and reused by every repo that contains the same blob. Entries live in a
+SQLite file (safe to share between processes) behind an in-memory LRU of
+recently used results.
+"""
+import marshal
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from graph_cache import CACHE_DIR
+from graph_engine import GRAPH_FORMAT_VERSION
+from step1_parser import CallRef, EntitySpan, ImportRef, ParsedFile
+
+PARSE_CACHE_MAX_BYTES = int(os.environ.get("REPOROVER_PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+PARSE_CACHE_HOT_ENTRIES = int(os.environ.get("REPOROVER_PARSE_CACHE_HOT", "20000"))
+
+# Parser output and marshal format both change the stored bytes
+_DB_NAME = f"parses-v{GRAPH_FORMAT_VERSION}-py{sys.version_info[0]}{sys.version_info[1]}.sqlite"
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+
+def encode_parse(parsed: ParsedFile) -> bytes:
+    return marshal.dumps((
+        [tuple(s) for s in parsed.spans],
+        [tuple(i) for i in parsed.imports],
+        [tuple(c) for c in parsed.calls],
+    ))
+
+
+def decode_parse(data: bytes) -> ParsedFile:
+    spans, imports, calls = marshal.loads(data)
+    return ParsedFile([EntitySpan(*s) for s in spans], [ImportRef(*i) for i in imports],
+                      [CallRef(*c) for c in calls])
+
+
+class ParseCache:
+    """
+    blob SHA -> ParsedFile. Lookups and writes are batched (one query per
+    load, not per file); the store drops the least recently used entries
+    once it grows past max_bytes. Any database error turns the lookup into
+    a miss, never a failed load.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES,
+                 hot_entries: int = PARSE_CACHE_HOT_ENTRIES):
+        self.path = Path(directory) / _DB_NAME
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self._hot = OrderedDict()  # sha -> ParsedFile, least recently used first
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """The shared connection, opened on first use. Caller holds the lock."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS parses "
+                       "(sha TEXT PRIMARY KEY, data BLOB NOT NULL, used REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS parses_used ON parses (used)")
+            self._db = db
+        return self._db
+
+    def _remember(self, sha: str, parsed: ParsedFile):
+        self._hot[sha] = parsed
+        self._hot.move_to_end(sha)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def get_many(self, shas) -> dict:
+        """{sha: ParsedFile} for the SHAs that are cached."""
+        found = {}
+        cold = []
+        with self._lock:
+            for sha in shas:
+                parsed = self._hot.get(sha)
+                if parsed is not None:
+                    self._hot.move_to_end(sha)
+                    found[sha] = parsed
+                else:
+                    cold.append(sha)
+            if not cold:
+                return found
+            try:
+                db = self._connect()
+                for i in range(0, len(cold), _QUERY_BATCH):
+                    batch = cold[i:i + _QUERY_BATCH]
+                    marks = ",".join("?" * len(batch))
+                    rows = db.execute(f"SELECT sha, data FROM parses WHERE sha IN ({marks})", batch).fetchall()
+                    for sha, data in rows:
+                        parsed = decode_parse(data)
+                        found[sha] = parsed
+                        self._remember(sha, parsed)
+                    if rows:
+                        db.execute(f"UPDATE parses SET used = ? WHERE sha IN ({','.join('?' * len(rows))})",
+                                   [time.time(), *(sha for sha, _ in rows)])
+            except (sqlite3.Error, OSError, ValueError, EOFError, TypeError):
+                pass  # corrupt or locked store: treat the rest as misses
+        return found
+
+    def put_many(self, parses: dict):
+        """Store {sha: ParsedFile}, then evict down to max_bytes."""
+        if not parses:
+            return
+        now = time.time()
+        with self._lock:
+            for sha, parsed in parses.items():
+                self._remember(sha, parsed)
+            try:
+                db = self._connect()
+                with db:
+                    db.execute("BEGIN")
+                    db.executemany("INSERT OR REPLACE INTO parses (sha, data, used) VALUES (?, ?, ?)",
+                                   [(sha, encode_parse(parsed), now) for sha, parsed in parses.items()])
+                self._evict(db)
+            except (sqlite3.Error, OSError):
+                pass  # an unwritable store must not fail the load
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM parses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the oldest entries down to 90% of the budget so eviction doesn't run every write
+        excess = total - int(self.max_bytes * 0.9)
+        cutoff = None
+        for used, size in db.execute("SELECT used, LENGTH(data) FROM parses ORDER BY used"):
+            excess -= size
+            cutoff = used
+            if excess <= 0:
+                break
+        if cutoff is not None:
+            db.execute("DELETE FROM parses WHERE used <= ?", (cutoff,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                entries, size = self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM parses").fetchone()
+            except (sqlite3.Error, OSError):
+                entries, size = 0, 0
+            return {"hot_entries": len(self._hot), "entries": entries, "bytes": size,
+                    "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            try:
+                self._connect().execute("DELETE FROM parses")
+            except (sqlite3.Error, OSError):
+                pass
+
+
+_default_parse_cache = None
+_default_parse_cache_lock = threading.Lock()
+
+
+def get_default_parse_cache():
+    """Shared parse cache; None when disabled via REPOROVER_PARSE_CACHE=0 or REPOROVER_CACHE=0."""
+    global _default_parse_cache
+    if os.environ.get("REPOROVER_PARSE_CACHE", "1") == "0" or os.environ.get("REPOROVER_CACHE", "1") == "0":
+        return None
+    with _default_parse_cache_lock:
+        if _default_parse_cache is None:
+            _default_parse_cache = ParseCache()
+        return _default_parse_cache
@@ -0,0 +1,216 @@
+"""
+prefetch.py — Answer the suggested questions in the background after a load.
+
+When enabled (REPOROVER_PREFETCH=1), the app hands a freshly loaded graph
+to the Prefetcher, which answers each suggested question on a small shared
+thread pool, within a process-wide rate limit on LLM calls, and leaves the
+results in the answer cache, so clicking a suggestion returns at once.
+Questions already cached, or being prefetched by another session, cost no
+LLM call. Each session's PrefetchBatch records which prefetched answers
+were clicked; the ones that never were are counted when the batch closes
+(also when the session goes away) to help tune the suggestion list.
+"""
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_cache import get_default_answer_cache
+from llm_engine import stream_answer
+from telemetry import start_trace
+
+PREFETCH_ENABLED = os.environ.get("REPOROVER_PREFETCH", "0") == "1"
+
+# Prefetch answers generated at once in this process
+PREFETCH_CONCURRENCY = int(os.environ.get("REPOROVER_PREFETCH_CONCURRENCY", "2"))
+
+# LLM calls per minute spent on prefetching, across all sessions
+PREFETCH_RATE = float(os.environ.get("REPOROVER_PREFETCH_RATE", "10"))
+
+SUGGESTED_QUESTIONS = (
+    "What does this repo do?",
+    "What are the main classes?",
+    "List all functions",
+    "Where is the main entry point?",
+    "What file types are in this repo?",
+)
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 60/per_minute seconds apart, whichever thread
+    makes them. A slot is only taken when the call can start, so callers
+    cancelled while waiting leave the budget to the others.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_event: threading.Event) -> bool:
+        """Wait until a call may start; False if cancel_event was set first."""
+        while not cancel_event.is_set():
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._next:
+                    self._next = now + self.interval
+                    return True
+                wait = self._next - now
+            cancel_event.wait(wait)
+        return False
+
+
+class _BatchState:
+    """What a batch tracks, kept apart from it so the finalizer can report it."""
+
+    def __init__(self, questions):
+        self.futures = {}              # question -> Future of "generated", "cached", "duplicate" or "skipped"
+        self.keys = {}                 # question -> answer cache key
+        self.cache = None
+        self.generating = set()        # questions past the rate limit, waiting on the model
+        self.clicked = set()
+        self.cancel_event = threading.Event()
+        self.trace = None
+        self.questions = questions
+
+
+class PrefetchBatch:
+    """One session's prefetch. claim() a suggestion before answering it; close() when done."""
+
+    def __init__(self, prefetcher, state: _BatchState):
+        self._state = state
+        self._close = weakref.finalize(self, prefetcher._close, state)
+
+    def ready(self, question: str) -> bool:
+        """Whether the question's answer is already in the answer cache."""
+        return _available(self._state, question)
+
+    def claim(self, question: str, timeout: float = 120):
+        """
+        The user asked `question`. If the model is generating it right now,
+        wait for it (it will then be a cache hit); if it hasn't got that far,
+        drop it so the user's own request isn't doubled.
+        """
+        state = self._state
+        state.clicked.add(question)
+        future = state.futures.get(question)
+        if future is None or future.cancel() or question not in state.generating:
+            return
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            pass  # the user's request simply goes to the model
+
+    def close(self):
+        self._close()  # runs at most once
+
+
+def _outcome(future):
+    """A finished prefetch's result, or None if it is missing, pending, cancelled or failed."""
+    if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def _available(state: _BatchState, question: str) -> bool:
+    outcome = _outcome(state.futures.get(question))
+    if outcome == "duplicate":
+        # Generated by another session's batch, if that has finished
+        return state.cache.get(state.keys[question]) is not None
+    return outcome in ("generated", "cached")
+
+
+class Prefetcher:
+    def __init__(self, max_workers: int = PREFETCH_CONCURRENCY, per_minute: float = PREFETCH_RATE,
+                 answer=stream_answer):
+        self.limiter = RateLimiter(per_minute)
+        self.answer = answer
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="reporover-prefetch")
+        self._inflight = set()  # answer cache keys being generated
+        self._lock = threading.Lock()
+        self._totals = {"prefetched": 0, "clicked": 0, "unclicked": 0}
+        self._unclicked = {}    # question -> times prefetched but never clicked
+
+    def start(self, graph, api_key: str, questions=SUGGESTED_QUESTIONS, **answer_kwargs):
+        """
+        Prefetch answers to `questions` about `graph`. Returns a PrefetchBatch,
+        or None when there is no answer cache to put them in or the graph is
+        still being indexed.
+        """
+        if get_default_answer_cache() is None and answer_kwargs.get("cache") is None:
+            return None
+        if graph.indexed_fraction < 1.0:
+            return None
+        state = _BatchState(tuple(questions))
+        state.trace = start_trace("prefetch", commit=graph.commit)
+        for question in state.questions:
+            state.futures[question] = self._pool.submit(self._run, state, graph, api_key, question, answer_kwargs)
+        return PrefetchBatch(self, state)
+
+    def _run(self, state: _BatchState, graph, api_key, question, answer_kwargs) -> str:
+        if state.cancel_event.is_set():
+            return "skipped"
+        stream = self.answer(question, graph, api_key, **answer_kwargs)
+        state.cache = stream.cache
+        state.keys[question] = stream.cache_key
+        if stream.cached is not None:
+            state.trace.count("cache_hits")
+            return "cached"
+        with self._lock:
+            if stream.cache_key in self._inflight:
+                # Another session is generating the same answer
+                state.trace.count("duplicates")
+                return "duplicate"
+            self._inflight.add(stream.cache_key)
+        try:
+            if not self.limiter.acquire(state.cancel_event):
+                return "skipped"
+            state.generating.add(question)
+            if question in state.clicked:
+                return "skipped"  # asked meanwhile; the user's request answers it
+            with state.trace.span("generate"):
+                for _ in stream:
+                    pass
+            state.trace.count("generated")
+            return "generated"
+        finally:
+            with self._lock:
+                self._inflight.discard(stream.cache_key)
+
+    def _close(self, state: _BatchState):
+        """Stop queued work and count the prefetched answers nobody clicked."""
+        state.cancel_event.set()
+        for future in state.futures.values():
+            future.cancel()
+        prefetched = [q for q in state.futures if _available(state, q)]
+        unclicked = [q for q in prefetched if q not in state.clicked]
+        with self._lock:
+            self._totals["prefetched"] += len(prefetched)
+            self._totals["clicked"] += len(prefetched) - len(unclicked)
+            self._totals["unclicked"] += len(unclicked)
+            for question in unclicked:
+                self._unclicked[question] = self._unclicked.get(question, 0) + 1
+        state.trace.count("prefetched", len(prefetched))
+        state.trace.count("clicked", len(prefetched) - len(unclicked))
+        state.trace.count("unclicked", len(unclicked))
+        state.trace.attrs["unclicked_questions"] = unclicked
+        state.trace.export()
+
+    def stats(self) -> dict:
+        """Totals over closed batches, and how often each question went unclicked."""
+        with self._lock:
+            return {**self._totals, "unclicked_by_question": dict(self._unclicked)}
+
+
+_default_prefetcher = None
+_default_prefetcher_lock = threading.Lock()
+
+
+def get_default_prefetcher() -> Prefetcher:
+    global _default_prefetcher
+    with _default_prefetcher_lock:
+        if _default_prefetcher is None:
+            _default_prefetcher = Prefetcher()
+        return _default_prefetcher
@@ -1,99 +1,708 @@
 """
 repo_loader.py — Clone a GitHub repo and feed all files into CodeGraph.
 """
+import os
 import shutil
 import tempfile
 import subprocess
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import unquote
+from chunkers import chunk_file
+from file_classifier import classify, summarize
+from file_walker import BINARY_EXTENSIONS, MAX_FILE_BYTES, SKIP_DIRS, is_binary, is_gitignored, walk_repo
 from graph_engine import CodeGraph
+from graph_cache import get_default_cache
+from parse_cache import get_default_parse_cache
+from retrieval import get_index
+from step1_parser import PARSE_THREADS, get_parse_pool, parse_file
+from telemetry import start_trace
 
+# Files handed to a worker process per task in parallel mode
+PARSE_BATCH_SIZE = 64
 
-# No limits: read all files from the repo
-BINARY_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".ico", ".bmp", ".webp",
-                     ".pdf", ".zip", ".tar", ".gz", ".7z", ".rar", ".exe",
-                     ".pyc", ".pyo", ".so", ".dll", ".dylib", ".bin", ".woff", ".woff2", ".ttf", ".otf"}
+# Parse processes used by clone_and_build_graph; "auto" = one per CPU
+_env_workers = os.environ.get("REPOROVER_WORKERS", "1")
+DEFAULT_WORKERS = None if _env_workers == "auto" else int(_env_workers)
+
+
+class LoadCancelled(RuntimeError):
+    """Raised when a load is stopped through its cancel_event."""
 
 
 def _is_valid_github_url(url: str) -> bool:
     url = url.strip().rstrip("/")
+    if url.startswith("file://"):
+        # Local repositories, used for tests and benchmarks
+        return True
     return "github.com" in url and len(url.split("/")) >= 5
 
 
 def _normalize_url(url: str) -> str:
     url = url.strip().rstrip("/")
-    if not url.endswith(".git"):
+    if not url.endswith(".git") and not url.startswith("file://"):
         url += ".git"
     return url
 
 
-def clone_and_build_graph(github_url: str, progress_callback=None) -> tuple[CodeGraph, dict]:
+def _cache_url(url: str) -> str:
+    """Canonical form of a normalized URL for cache keys (GitHub paths are case-insensitive)."""
+    if url.startswith("file://"):
+        return url
+    return url.lower().replace("http://", "https://")
+
+
+def _git(args: list[str], cwd=None, timeout: int = 60) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _run_cancellable(args: list[str], cancel_event=None, timeout: int = 60, cwd=None):
+    """subprocess.run() that kills the process as soon as cancel_event is set."""
+    proc = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=0.1)
+            return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            if cancelled or time.monotonic() > deadline:
+                proc.kill()
+                proc.communicate()
+                if cancelled:
+                    raise LoadCancelled("Load cancelled")
+                raise
+
+
+def _resolve_head(url: str):
+    """Commit SHA of the remote's HEAD without cloning, or None if it can't be resolved."""
+    try:
+        out = _git(["ls-remote", url, "HEAD"], timeout=30)
+    except (RuntimeError, subprocess.TimeoutExpired):
+        return None
+    return out.split()[0] if out.strip() else None
+
+
+def _blob_shas(cwd: str, ref: str) -> dict:
+    """{path: git blob SHA} for every file in `ref`'s tree, or {} if git can't list it."""
+    try:
+        out = _git(["ls-tree", "-r", "-z", ref], cwd=cwd)
+    except (RuntimeError, subprocess.TimeoutExpired, UnicodeDecodeError):
+        return {}
+    shas = {}
+    for record in out.split("\0"):
+        meta, _, path = record.partition("\t")
+        fields = meta.split()
+        if len(fields) == 3 and fields[1] == "blob":
+            shas[path] = fields[2]
+    return shas
+
+
+def _cached_parses(parse_cache, blob_shas: dict, rel_paths, trace) -> dict:
+    """{rel_path: ParsedFile} for the Python files whose blobs are in the parse cache."""
+    py_shas = {p: blob_shas[p] for p in rel_paths if p.endswith(".py") and p in blob_shas}
+    with trace.span("parse_cache"):
+        found = parse_cache.get_many(set(py_shas.values()))
+    cached = {p: found[sha] for p, sha in py_shas.items() if sha in found}
+    trace.count("parse_cache_hits", len(cached))
+    trace.count("parse_cache_misses", len(py_shas) - len(cached))
+    return cached
+
+
+class RepoSpec(NamedTuple):
+    """What a repo URL asks for: the repo, and optionally a ref and a subtree."""
+    url: str           # clone URL, as from _normalize_url()
+    ref: str = ""      # branch, tag or commit SHA; "" = the default branch
+    subdir: str = ""   # "/"-separated path inside the repo; "" = the whole repo
+
+    @property
+    def cache_url(self) -> str:
+        """Cache/registry key: the repo plus the subtree, since each subtree is its own graph."""
+        url = _cache_url(self.url)
+        return f"{url}#{self.subdir}" if self.subdir else url
+
+
+def _is_sha(ref: str) -> bool:
+    return 7 <= len(ref) <= 40 and all(c in "0123456789abcdef" for c in ref.lower())
+
+
+def _ls_remote_refs(url: str) -> dict:
+    """{ref name: commit} of the remote's branches and tags (annotated tags peeled), or {}."""
+    try:
+        out = _git(["ls-remote", "--heads", "--tags", url], timeout=30)
+    except (RuntimeError, subprocess.TimeoutExpired):
+        return {}
+    refs = {}
+    for line in out.splitlines():
+        sha, _, name = line.partition("\t")
+        if name.endswith("^{}"):
+            refs[name[:-3]] = sha  # the commit an annotated tag points to
+        else:
+            refs.setdefault(name, sha)
+    return refs
+
+
+def parse_repo_url(github_url: str) -> RepoSpec:
+    """
+    Split a repo URL into clone URL, ref and subdirectory. Accepts
+    https://github.com/owner/repo and .../tree/<branch, tag or commit>/<path>
+    as copied from GitHub; file:// URLs take the same /tree/<ref>/<path>
+    suffix after the repository path. Branch names may contain "/": the
+    remote's refs decide where the ref ends and the path begins.
+    """
+    url = github_url.strip().split("#", 1)[0].split("?", 1)[0].rstrip("/")
+    base, rest = url, []
+    if url.startswith("file://"):
+        # The first "/tree/" after an existing directory ends the repo path
+        start = 0
+        while (i := url.find("/tree/", start)) != -1:
+            if os.path.isdir(url[len("file://"):i]):
+                base, rest = url[:i], url[i + len("/tree/"):].split("/")
+                break
+            start = i + 1
+    else:
+        parts = url.split("/")
+        if len(parts) > 6 and parts[5] == "tree":
+            base, rest = "/".join(parts[:5]), parts[6:]
+    rest = [unquote(p) for p in rest if p]
+    if any(p in (".", "..") for p in rest):
+        raise ValueError("The path in the URL must not contain '.' or '..' segments.")
+    base = _normalize_url(base)
+    if len(rest) > 1:
+        refs = _ls_remote_refs(base)
+        # Longest prefix of the path that names a branch or tag
+        for n in range(len(rest), 0, -1):
+            ref = "/".join(rest[:n])
+            if f"refs/heads/{ref}" in refs or f"refs/tags/{ref}" in refs:
+                return RepoSpec(base, ref, "/".join(rest[n:]))
+    return RepoSpec(base, rest[0] if rest else "", "/".join(rest[1:]))
+
+
+def _resolve_commit(spec: RepoSpec):
+    """Commit the spec's ref points at on the remote, or None if it can't be resolved."""
+    if not spec.ref:
+        return _resolve_head(spec.url)
+    if len(spec.ref) == 40 and _is_sha(spec.ref):
+        return spec.ref.lower()
+    refs = _ls_remote_refs(spec.url)
+    return refs.get(f"refs/heads/{spec.ref}") or refs.get(f"refs/tags/{spec.ref}")
+
+
+def _fetch_subtree(spec: RepoSpec, tmpdir: str, cancel_event=None):
+    """
+    Check out spec.ref (default HEAD) into tmpdir with a blobless, shallow
+    fetch, limited by a sparse checkout to spec.subdir (plus top-level
+    files) when one is given, so only that subtree's file contents are
+    downloaded. Short SHAs and commits that aren't a branch or tag tip fall
+    back to fetching the (blobless) history.
+    """
+    _git(["init", "-q"], cwd=tmpdir)
+    _git(["remote", "add", "origin", spec.url], cwd=tmpdir)
+    if spec.subdir:
+        _git(["sparse-checkout", "set", "--cone", spec.subdir], cwd=tmpdir)
+
+    ref = spec.ref or "HEAD"
+    result = _run_cancellable(["git", "fetch", "-q", "--depth=1", "--filter=blob:none", "origin", ref],
+                              cancel_event, cwd=tmpdir)
+    target = "FETCH_HEAD"
+    if result.returncode != 0 and _is_sha(ref):
+        result = _run_cancellable(["git", "fetch", "-q", "--filter=blob:none", "origin",
+                                   "+refs/heads/*:refs/remotes/origin/*", "+refs/tags/*:refs/tags/*"],
+                                  cancel_event, cwd=tmpdir)
+        target = ref
+    if result.returncode != 0:
+        raise RuntimeError(f"Git fetch of {ref!r} failed: {result.stderr.strip()}")
+
+    result = _run_cancellable(["git", "checkout", "-q", "--detach", target], cancel_event, cwd=tmpdir)
+    if result.returncode != 0:
+        raise RuntimeError(f"Git checkout of {ref!r} failed: {result.stderr.strip()}")
+    if spec.subdir and not os.path.isdir(os.path.join(tmpdir, spec.subdir)):
+        raise RuntimeError(f"Path {spec.subdir!r} does not exist at {ref}.")
+
+
+def _is_indexable(rel_path: str) -> bool:
+    path = Path(rel_path)
+    return (
+        not any(part in SKIP_DIRS for part in path.parts)
+        and path.suffix.lower() not in BINARY_EXTENSIONS
+    )
+
+
+def _is_readable_file(path: str) -> bool:
+    return (
+        os.path.isfile(path) and not os.path.islink(path)
+        and os.path.getsize(path) <= MAX_FILE_BYTES
+        and not is_binary(path)
+    )
+
+
+def _read_and_parse(root: str, rel_path: str, parse: bool = True):
+    """
+    Read one file and, for Python, extract its entities, imports and calls;
+    other files are split into chunks (see chunkers.py). With parse=False a
+    Python file is only read (its parse comes from the parse cache).
+    Returns (rel_path, code, parsed, category, cost) or None when the file
+    can't be read/parsed. For lockfiles, generated, minified and data files
+    `category` names the kind and `code` is only a summary of the file.
+    cost is (read_s, parse_s, bytes_read): seconds spent reading (and
+    classifying) and parsing, and the file's size.
+    """
+    try:
+        t0 = time.perf_counter()
+        raw = (Path(root) / rel_path).read_bytes()
+        code = raw.decode("utf-8", errors="ignore")
+        if "\r" in code:
+            # Universal newlines, as read_text() would give
+            code = code.replace("\r\n", "\n").replace("\r", "\n")
+        category = classify(rel_path, code)
+        if category is not None:
+            code = summarize(rel_path, code, category)
+            return rel_path, code, None, category, (time.perf_counter() - t0, 0.0, len(raw))
+        t1 = time.perf_counter()
+        if not rel_path.endswith(".py"):
+            parsed = chunk_file(rel_path, code)
+        else:
+            parsed = parse_file(code) if parse else None
+    except Exception:
+        return None
+    return rel_path, code, parsed, None, (t1 - t0, time.perf_counter() - t1, len(raw))
+
+
+def _add_parsed(graph: CodeGraph, parsed, summarized: dict, trace) -> int:
+    """Insert a _read_and_parse() result into the graph, recording its cost on `trace`."""
+    rel_path, code, file_parse, category, (read_s, parse_s, bytes_read) = parsed
+    trace.add_time("read", read_s)
+    trace.add_time("parse", parse_s)
+    trace.count("bytes_read", bytes_read)
+    if category is not None:
+        summarized[category] = summarized.get(category, 0) + 1
+        return graph.add_summary(rel_path, code, category)
+    return graph.add_file(rel_path, code, parsed=file_parse)
+
+
+def _parse_batch(root: str, rel_paths: list[str], cached=frozenset()) -> list:
+    """Worker entry point: each process parses with its own parser."""
+    return [_read_and_parse(root, p, parse=p not in cached) for p in rel_paths]
+
+
+def _collect_parse(new_parses: dict, parsed, blob_shas: dict, cached: dict):
+    """Remember a freshly parsed Python file under its blob SHA for the parse cache."""
+    rel_path, file_parse = parsed[0], parsed[2]
+    if file_parse is not None and rel_path.endswith(".py") and rel_path not in cached and rel_path in blob_shas:
+        new_parses[blob_shas[rel_path]] = file_parse
+
+
+def _iter_parsed_threads(root: str, rel_paths, result, cached: dict):
+    """_iter_parsed() on the shared parse threads, with a few files per thread in flight."""
+    pool = get_parse_pool()
+    in_flight = 2 * PARSE_THREADS
+    pending = deque()
+    try:
+        for rel_path in rel_paths:
+            pending.append((rel_path, pool.submit(_read_and_parse, root, rel_path, rel_path not in cached)))
+            while pending and (len(pending) > in_flight or pending[0][1].done()):
+                rel_path, future = pending.popleft()
+                yield result(rel_path, future.result())
+        while pending:
+            rel_path, future = pending.popleft()
+            yield result(rel_path, future.result())
+    finally:
+        # Consumer stopped early (cancelled load): don't parse what's still queued
+        for _, future in pending:
+            future.cancel()
+
+
+def _iter_parsed(root: str, rel_paths, workers: int, cached=None):
+    """
+    Yield (rel_path, _read_and_parse() result) in rel_paths order, either
+    from the process-wide parse thread pool (workers <= 1) or from a process
+    pool that parses batches of files concurrently. rel_paths is consumed
+    lazily, so given a walk_repo() iterator, files are parsed while the
+    walk is still running.
+    `cached` maps rel_path to a ParsedFile from the parse cache; those files
+    are read but not parsed.
+    """
+    cached = cached or {}
+
+    def result(rel_path, parsed):
+        if parsed is not None and rel_path in cached and parsed[3] is None:
+            parsed = (rel_path, parsed[1], cached[rel_path], None, parsed[4])
+        return rel_path, parsed
+
+    paths = iter(rel_paths)
+    first = list(islice(paths, PARSE_BATCH_SIZE))
+    if workers <= 1 or len(first) < PARSE_BATCH_SIZE:
+        yield from _iter_parsed_threads(root, chain(first, paths), result, cached)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    finished = False
+    try:
+        pending = deque()
+        batch = first
+        while batch:
+            skip = frozenset(p for p in batch if p in cached)
+            pending.append((batch, pool.submit(_parse_batch, root, batch, skip)))
+            # Keep a couple of batches per worker in flight; hand back finished ones in order
+            while pending and (len(pending) > 2 * workers or pending[0][1].done()):
+                done_batch, future = pending.popleft()
+                yield from map(result, done_batch, future.result())
+            batch = list(islice(paths, PARSE_BATCH_SIZE))
+        while pending:
+            done_batch, future = pending.popleft()
+            yield from map(result, done_batch, future.result())
+        finished = True
+    finally:
+        # When the consumer stops early (cancelled load), drop queued batches
+        # and let workers exit after their current one instead of waiting
+        pool.shutdown(wait=finished, cancel_futures=True)
+
+
+def clone_and_build_graph(github_url: str, progress_callback=None, workers=DEFAULT_WORKERS,
+                          use_cache: bool = True, cache=None, cancel_event=None,
+                          on_graph=None, parse_cache=None, spec: RepoSpec = None,
+                          head: str = None) -> tuple[CodeGraph, dict]:
     """
     Clone a public GitHub repo, parse all files (excluding binaries), build a CodeGraph.
     Returns (graph, info_dict).
+    A URL naming a ref and path (.../tree/<ref>/<path>, see parse_repo_url)
+    loads that commit with a blobless fetch and sparse checkout, and
+    indexes only the files under the path.
     progress_callback(message: str) is called with status updates.
+    workers > 1 reads and parses files in that many processes (None = one per
+    CPU); the resulting graph is identical to the serial path.
+    Builds are cached per (URL and path, commit) in `cache` (default: the shared
+    GraphCache) unless use_cache is False. Python files whose git blob is
+    in `parse_cache` (default: the shared ParseCache, also off when
+    use_cache is False) are not reparsed, whichever repo they came from.
+    Setting `cancel_event` (a threading.Event) kills the clone or stops
+    parsing and raises LoadCancelled.
+    on_graph(graph), if given, receives the graph as soon as parsing starts
+    so it can be queried while files are still being added (README, entry
+    points and top-level modules first; see graph.indexed_fraction).
+    A caller that already ran parse_repo_url() and _resolve_commit() (the
+    graph registry) passes their results as `spec` and `head`, so the
+    remote is not asked again.
     """
     if not _is_valid_github_url(github_url):
         raise ValueError("Please provide a valid public GitHub URL, e.g. https://github.com/user/repo")
 
-    url = _normalize_url(github_url)
-    tmpdir = tempfile.mkdtemp(prefix="reporover_")
+    spec = spec or parse_repo_url(github_url)
+    url = spec.url
+    if use_cache and cache is None:
+        cache = get_default_cache()
+    if use_cache and parse_cache is None:
+        parse_cache = get_default_parse_cache()
+    if not use_cache:
+        cache = parse_cache = None
 
     def log(msg):
         if progress_callback:
             progress_callback(msg)
 
+    # Stage durations: read/parse are summed over files (across workers in
+    # parallel mode), walk is the time the walker spent producing paths
+    trace = start_trace("load", repo_url=github_url)
+    started = time.perf_counter()
+
+    if cache is not None:
+        with trace.span("cache_lookup"):
+            head = head or _resolve_commit(spec)
+            cached = cache.get(spec.cache_url, head) if head else None
+        if cached is not None:
+            graph, info = cached
+            log(f"⚡ Loaded from cache ({head[:10]})")
+            with trace.span("index"):
+                get_index(graph)
+            trace.add_time("total", time.perf_counter() - started)
+            trace.count("entities", info.get("total_entities", 0))
+            trace.attrs.update(commit=head, cache_hit=True)
+            trace.export()
+            return graph, {**info, "repo_url": github_url, "cache_hit": True,
+                           "timings": trace.timings, "counters": trace.counters}
+
+    tmpdir = tempfile.mkdtemp(prefix="reporover_")
+    blob_shas = {}
+    cached_parses = {}
+    new_parses = {}  # blob SHA -> ParsedFile, written to parse_cache at the end
+
     try:
-        log(f"📥 Cloning repository...")
-        result = subprocess.run(
-            ["git", "clone", "--depth=1", "--single-branch", url, tmpdir],
-            capture_output=True, text=True, timeout=60
-        )
-        if result.returncode != 0:
-            raise RuntimeError(f"Git clone failed: {result.stderr.strip()}")
-
-        log("🔍 Scanning all files...")
-        all_files = [f for f in Path(tmpdir).rglob("*") if f.is_file()]
-
-        # Filter out common non-useful dirs and binary files
-        skip_dirs = {"__pycache__", ".git", "node_modules", "venv", ".venv", "env"}
-        files = [
-            f for f in all_files
-            if not any(part in skip_dirs for part in f.parts)
-            and f.suffix.lower() not in BINARY_EXTENSIONS
-        ]
-
-        if not files:
-            raise RuntimeError("No readable files found in this repository.")
+        with trace.span("clone"):
+            if spec.ref or spec.subdir:
+                log(f"📥 Fetching {spec.subdir or 'repository'} at {spec.ref or 'HEAD'}...")
+                _fetch_subtree(spec, tmpdir, cancel_event)
+            else:
+                log(f"📥 Cloning repository...")
+                result = _run_cancellable(
+                    ["git", "clone", "--depth=1", "--single-branch", url, tmpdir], cancel_event
+                )
+                if result.returncode != 0:
+                    raise RuntimeError(f"Git clone failed: {result.stderr.strip()}")
+            commit = _git(["rev-parse", "HEAD"], cwd=tmpdir).strip()
 
+        log("🔍 Scanning and parsing files...")
         graph = CodeGraph()
+        graph.commit = commit
+        total_files = 0
         parsed_files = 0
         skipped = 0
+        skipped_by_category = {}
+        summarized_by_category = {}
 
-        for i, filepath in enumerate(files):
-            rel_path = str(filepath.relative_to(tmpdir))
-            log(f"⚙️  Parsing ({i+1}/{len(files)}): {rel_path}")
-            try:
-                code = filepath.read_text(encoding="utf-8", errors="ignore")
-                count = graph.add_file(rel_path, code)
-                if count >= 0:
-                    parsed_files += 1
-                else:
-                    skipped += 1
-            except Exception:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        # Skip dirs, .gitignore'd paths, binaries and oversized files are
+        # filtered by the walker, which streams the rest most useful first
+        # (shallow paths, README and entry points leading), so parsing
+        # starts before the walk is done.
+        # A sparse checkout also has the top-level files, which are left out
+        paths = walk_repo(tmpdir, skipped=skipped_by_category, by_priority=True)
+        if spec.subdir:
+            paths = (p for p in paths if p.startswith(spec.subdir + "/"))
+        # The tree listing is cheap next to the walk: it sizes the progress
+        # bar (an upper bound; ignored and binary files drop out) and finds
+        # the parse cache hits up front
+        tree = _blob_shas(tmpdir, "HEAD")
+        tree_paths = [p for p in tree if _is_indexable(p) and (not spec.subdir or p.startswith(spec.subdir + "/"))]
+        if parse_cache is not None:
+            blob_shas = tree
+            cached_parses = _cached_parses(parse_cache, blob_shas, tree_paths, trace)
+
+        # From here the graph may be queried while files are still being added
+        graph.expected_files = len(tree_paths)
+        if on_graph is not None:
+            on_graph(graph)
+
+        for rel_path, parsed in _iter_parsed(tmpdir, trace.timed_iter(paths, "walk"), workers, cached_parses):
+            if cancel_event is not None and cancel_event.is_set():
+                raise LoadCancelled("Load cancelled")
+            total_files += 1
+            graph.expected_files = max(graph.expected_files, total_files)
+            log(f"⚙️  Parsing ({total_files}/{graph.expected_files}): {rel_path}")
+            if parsed is None:
                 skipped += 1
-                continue
+            else:
+                _collect_parse(new_parses, parsed, blob_shas, cached_parses)
+                with trace.span("graph"):
+                    try:
+                        count = _add_parsed(graph, parsed, summarized_by_category, trace)
+                        if count >= 0:
+                            parsed_files += 1
+                        else:
+                            skipped += 1
+                    except Exception:
+                        skipped += 1
+            graph.processed_files = total_files
+        if not total_files:
+            raise RuntimeError(f"No readable files found in {spec.subdir or 'this repository'}.")
+        # Complete first, so the link covers every file (see CodeGraph.link)
+        graph.expected_files = None
+        with trace.span("link"):
+            graph.link()
+        # The search index is ready before the load reports done, so the
+        # first question doesn't pay for it
+        log("🔎 Indexing for search...")
+        with trace.span("index"):
+            get_index(graph)
 
         stats = graph.get_stats()
+        trace.count("files", total_files)
+        trace.count("entities", stats["total_entities"])
         info = {
             "repo_url": github_url,
-            "total_files": len(files),
+            "ref": spec.ref,
+            "subdir": spec.subdir,
+            "total_files": total_files,
             "parsed_files": parsed_files,
             "skipped_files": skipped,
+            "skipped_by_category": skipped_by_category,
+            "summarized_by_category": summarized_by_category,
+            "commit": commit,
+            "cache_hit": False,
+            "timings": trace.timings,
+            "counters": trace.counters,
             **stats,
         }
+        if new_parses:
+            with trace.span("parse_cache"):
+                parse_cache.put_many(new_parses)
+            new_parses.clear()
+        if cache is not None:
+            with trace.span("cache_write"):
+                try:
+                    cache.put(spec.cache_url, commit, graph, info)
+                except OSError:
+                    pass  # an unwritable cache must not fail the load
+        trace.add_time("total", time.perf_counter() - started)
+        trace.attrs.update(commit=commit, cache_hit=False)
+        trace.export()
 
         log(f"✅ Done! Parsed {parsed_files} files → {stats['functions']} functions, {stats['classes']} classes")
         return graph, info
 
     finally:
+        # Also after a cancel or failure, so a retry doesn't redo that work
+        if new_parses:
+            parse_cache.put_many(new_parses)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def update_graph(graph: CodeGraph, github_url: str, old_commit=None, new_commit=None,
+                 progress_callback=None, workers=DEFAULT_WORKERS,
+                 use_cache: bool = True, cache=None, parse_cache=None) -> tuple[CodeGraph, dict]:
+    """
+    Bring a graph built at old_commit (default graph.commit) up to new_commit
+    (default the URL's ref, or the remote HEAD); for a URL with a
+    path only changes under that path are applied. Only the two commits' trees are
+    fetched; files deleted or modified between them are dropped from the
+    graph and only added/modified files are downloaded and reparsed (or
+    taken from the parse cache), with the same .gitignore, size and binary
+    rules as a full load. Returns (graph, info_dict) where graph is an
+    updated copy: `graph` itself, which may be shared, is never modified.
+    Files whose ignore status changed only because a .gitignore changed
+    are not revisited; a full load picks those up.
+    """
+    if not _is_valid_github_url(github_url):
+        raise ValueError("Please provide a valid public GitHub URL, e.g. https://github.com/user/repo")
+
+    spec = parse_repo_url(github_url)
+    url = spec.url
+    old_commit = old_commit or graph.commit
+    if not old_commit:
+        raise ValueError("The graph has no recorded commit; do a full load instead.")
+    if use_cache and cache is None:
+        cache = get_default_cache()
+    if use_cache and parse_cache is None:
+        parse_cache = get_default_parse_cache()
+    if not use_cache:
+        cache = parse_cache = None
+
+    def log(msg):
+        if progress_callback:
+            progress_callback(msg)
+
+    trace = start_trace("update", repo_url=github_url, previous_commit=old_commit)
+    started = time.perf_counter()
+    tmpdir = tempfile.mkdtemp(prefix="reporover_")
+    blob_shas = {}
+    cached_parses = {}
+    new_parses = {}
+    try:
+        log("📥 Fetching changes...")
+        with trace.span("fetch"):
+            _git(["init", "-q"], cwd=tmpdir)
+            _git(["fetch", "-q", "--depth=1", "--filter=blob:none", url,
+                  f"+{old_commit}:refs/reporover/old",
+                  f"+{new_commit or spec.ref or 'HEAD'}:refs/reporover/new"], cwd=tmpdir)
+            new_commit = _git(["rev-parse", "refs/reporover/new"], cwd=tmpdir).strip()
+
+        fields = _git(["diff", "--name-status", "--no-renames", "-z",
+                       "refs/reporover/old", "refs/reporover/new", "--", spec.subdir or "."],
+                      cwd=tmpdir).split("\0")
+        changes = [(status, path) for status, path in zip(fields[0::2], fields[1::2])
+                   if _is_indexable(path)]
+        deleted = [path for status, path in changes if status == "D"]
+        changed = [path for status, path in changes if status != "D"]
+
+        if changed:
+            log(f"📥 Downloading {len(changed)} changed files...")
+            # The .gitignore files come along so the full walk's rules apply
+            gitignores = [p for p in _blob_shas(tmpdir, "refs/reporover/new")
+                          if p == ".gitignore" or p.endswith("/.gitignore")]
+            with trace.span("checkout"):
+                result = subprocess.run(
+                    ["git", "checkout", "-q", "refs/reporover/new",
+                     "--pathspec-from-file=-", "--pathspec-file-nul"],
+                    cwd=tmpdir, input="\0".join(dict.fromkeys(changed + gitignores)),
+                    capture_output=True, text=True, timeout=60
+                )
+            if result.returncode != 0:
+                raise RuntimeError(f"Git checkout failed: {result.stderr.strip()}")
+
+        # Same .gitignore/symlink/size/binary rules as the full walk
+        ignore_rules = {}
+        to_parse = [path for path in changed if not is_gitignored(tmpdir, path, ignore_rules)
+                    and _is_readable_file(os.path.join(tmpdir, path))]
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        parsed_files = 0
+        skipped = 0
+        summarized_by_category = {}
+        if parse_cache is not None and to_parse:
+            blob_shas = _blob_shas(tmpdir, "refs/reporover/new")
+            cached_parses = _cached_parses(parse_cache, blob_shas, to_parse, trace)
+        results = []
+        for i, (rel_path, parsed) in enumerate(_iter_parsed(tmpdir, to_parse, workers, cached_parses)):
+            log(f"⚙️  Parsing ({i+1}/{len(to_parse)}): {rel_path}")
+            if parsed is None:
+                skipped += 1
+                continue
+            _collect_parse(new_parses, parsed, blob_shas, cached_parses)
+            results.append(parsed)
+
+        # Everything is fetched and parsed: only now touch (a copy of) the graph
+        graph = graph.copy()
+        removed = 0
+        for path in deleted + changed:
+            removed += graph.remove_file(path) > 0
+        for parsed in results:
+            with trace.span("graph"):
+                try:
+                    _add_parsed(graph, parsed, summarized_by_category, trace)
+                    parsed_files += 1
+                except Exception:
+                    skipped += 1
+
+        graph.commit = new_commit
+        with trace.span("link"):
+            graph.link()
+        with trace.span("index"):
+            get_index(graph)
+        stats = graph.get_stats()
+        trace.count("files", len(to_parse))
+        trace.count("entities", stats["total_entities"])
+        info = {
+            "repo_url": github_url,
+            "total_files": stats["files"],
+            "parsed_files": stats["files"],
+            "skipped_files": skipped,
+            "commit": new_commit,
+            "previous_commit": old_commit,
+            "reparsed_files": parsed_files,
+            "removed_files": removed,
+            "deleted_files": len(deleted),
+            "summarized_by_category": summarized_by_category,
+            "cache_hit": False,
+            "timings": trace.timings,
+            "counters": trace.counters,
+            **stats,
+        }
+        if new_parses:
+            with trace.span("parse_cache"):
+                parse_cache.put_many(new_parses)
+            new_parses.clear()
+        if cache is not None:
+            with trace.span("cache_write"):
+                try:
+                    cache.put(spec.cache_url, new_commit, graph, info)
+                except OSError:
+                    pass  # an unwritable cache must not fail the load
+        trace.add_time("total", time.perf_counter() - started)
+        trace.attrs.update(commit=new_commit)
+        trace.export()
+
+        log(f"✅ Updated {len(changed)} files, removed {len(deleted)} → {stats['functions']} functions, {stats['classes']} classes")
+        return graph, info
+
+    finally:
+        if new_parses:
+            parse_cache.put_many(new_parses)
         shutil.rmtree(tmpdir, ignore_errors=True)
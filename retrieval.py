@@ -0,0 +1,199 @@
+"""
+retrieval.py — BM25 ranking of code entities against a natural-language question.
+"""
+import heapq
+import math
+import re
+import threading
+import weakref
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from graph_engine import CodeGraph
+
+# BM25 parameters (standard Okapi defaults)
+K1 = 1.2
+B = 0.75
+
+# An entity's name (and, less so, its file path) says more about what it is
+# than any single word of its body, so those tokens are counted extra times.
+NAME_WEIGHT = 3
+PATH_WEIGHT = 1
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it its
+me of on or show tell that the this to was what when where which who why
+will with you your all any self none true false return def class import
+""".split())
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so "removes", "removed" and "remove" meet."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and not word.endswith("ss") and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=1 << 16)
+def _identifier_terms(ident: str) -> tuple[str, ...]:
+    parts = [p.lower() for piece in ident.split("_") for p in _CAMEL_PART.findall(piece)]
+    terms = [_stem(p) for p in parts if p not in STOPWORDS]
+    if len(parts) > 1:
+        terms.append(ident.lower().strip("_"))
+    return tuple(t for t in terms if len(t) > 1)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased terms for BM25: identifiers are split on snake_case and
+    camelCase boundaries (each part lightly stemmed), and compound
+    identifiers are also kept whole.
+    """
+    tokens = []
+    for ident in _IDENTIFIER.findall(text):
+        tokens.extend(_identifier_terms(ident))
+    return tokens
+
+
+class BM25Index:
+    """
+    Sparse BM25 index over a graph's code entities. Each term maps to two
+    parallel arrays, entity numbers and term frequencies. A term's BM25
+    impacts are computed the first time a query uses it and kept until the
+    index changes, so a query only touches the postings of its own terms.
+    update() indexes just the entities added since the last call when the
+    graph has only grown, as it does while a load is running. to_state()
+    and from_state() let a cached graph bring its index along.
+    """
+
+    def __init__(self, graph: CodeGraph = None):
+        self._lock = threading.Lock()
+        self._reset()
+        if graph is not None:
+            self.update(graph)
+
+    def _reset(self):
+        self.version = -1
+        self.entity_ids = []
+        self.lengths = array("f")
+        self.postings = {}   # term -> (entity numbers, term frequencies)
+        self._impacts = {}   # term -> BM25 impact per posting, for the current lengths
+        self._norms = array("f")
+
+    def update(self, graph: CodeGraph):
+        """Bring the index up to the graph's current version."""
+        with self._lock:
+            with graph.lock:
+                if self.version == graph.version:
+                    return
+                version = graph.version
+                ids = graph.get_entity_ids()
+                if ids[:len(self.entity_ids)] != self.entity_ids:
+                    self._reset()  # entities were removed or replaced
+                new = [(node_id, graph.get_node(node_id)) for node_id in ids[len(self.entity_ids):]]
+
+            for node_id, d in new:
+                tf = Counter(tokenize(graph.get_content(d)))
+                for t in tokenize(d.get("name", "")):
+                    tf[t] += NAME_WEIGHT
+                for t in tokenize(d.get("filename", "")):
+                    tf[t] += PATH_WEIGHT
+                doc = len(self.entity_ids)
+                self.entity_ids.append(node_id)
+                self.lengths.append(sum(tf.values()))
+                for term, freq in tf.items():
+                    posting = self.postings.get(term)
+                    if posting is None:
+                        posting = self.postings[term] = (array("I"), array("f"))
+                    posting[0].append(doc)
+                    posting[1].append(freq)
+
+            if new or self.version < 0:
+                n_docs = len(self.entity_ids)
+                avg_len = (sum(self.lengths) / n_docs) if n_docs else 0.0
+                self._norms = array("f", (K1 * (1 - B + B * length / avg_len) for length in self.lengths)
+                                    if avg_len else (K1 for _ in self.lengths))
+                self._impacts.clear()
+            self.version = version
+
+    def to_state(self) -> tuple:
+        """Entity ids, lengths and postings as plain marshal-able data."""
+        with self._lock:
+            return (self.entity_ids, self.lengths.tobytes(), self._norms.tobytes(),
+                    {term: (docs.tobytes(), freqs.tobytes()) for term, (docs, freqs) in self.postings.items()})
+
+    @classmethod
+    def from_state(cls, state: tuple, graph: CodeGraph) -> "BM25Index":
+        """
+        The index to_state() saved, as an up-to-date index of `graph`.
+        Raises ValueError if the graph's entities are not the ones indexed.
+        """
+        entity_ids, lengths, norms, postings = state
+        index = cls()
+        with graph.lock:
+            if graph.get_entity_ids() != entity_ids:
+                raise ValueError("index does not match the graph's entities")
+            index.version = graph.version
+        index.entity_ids = entity_ids
+        index.lengths.frombytes(lengths)
+        index._norms.frombytes(norms)
+        index.postings = {term: (array("I", docs), array("f", freqs)) for term, (docs, freqs) in postings.items()}
+        return index
+
+    def _term_impacts(self, term: str):
+        """Impacts of the term's postings, computed on first use. Caller holds the lock."""
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            docs, freqs = self.postings[term]
+            n_docs = len(self.entity_ids)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norms = self._norms
+            impacts = self._impacts[term] = array(
+                "f", (idf * freq * (K1 + 1) / (freq + norms[doc]) for doc, freq in zip(docs, freqs)))
+        return impacts
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        """Top-k (entity_id, score) pairs for the query, best first."""
+        scores = defaultdict(float)
+        with self._lock:
+            for term in set(tokenize(query)):
+                if term not in self.postings:
+                    continue
+                for doc, impact in zip(self.postings[term][0], self._term_impacts(term)):
+                    scores[doc] += impact
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self.entity_ids[doc], score) for doc, score in top]
+
+
+_indexes = weakref.WeakKeyDictionary()  # CodeGraph -> BM25Index
+_indexes_lock = threading.Lock()
+
+
+def get_index(graph: CodeGraph) -> BM25Index:
+    """The graph's BM25 index, built on first use and updated after the graph changes."""
+    with _indexes_lock:
+        index = _indexes.get(graph)
+        if index is None:
+            index = _indexes[graph] = BM25Index()
+    if index.version != graph.version:
+        index.update(graph)
+    return index
+
+
+def set_index(graph: CodeGraph, index: BM25Index):
+    """Use `index` as the graph's BM25 index, e.g. one restored with BM25Index.from_state()."""
+    with _indexes_lock:
+        _indexes[graph] = index
+
+
+def rank_entities(graph: CodeGraph, question: str, k: int = 10) -> list[dict]:
+    """Attribute dicts of the k entities most relevant to the question."""
+    return [graph.get_node(node_id) for node_id, _ in get_index(graph).search(question, k)]
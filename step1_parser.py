@@ -1,60 +1,235 @@
+"""
+step1_parser.py — Tree-sitter extraction of Python functions and classes,
+plus the imports and calls that link them.
+"""
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
 import tree_sitter_python as tspython
 from tree_sitter import Language, Parser
 from langchain_core.documents import Document
 
 PY_LANGUAGE = Language(tspython.language())
 
+DEFINITION_TYPES = ("function_definition", "class_definition")
 
-try:
-    parser = Parser(PY_LANGUAGE)          # 0.23+ style
-except TypeError:
-    parser = Parser()                      # fallback for older builds
-    parser.set_language(PY_LANGUAGE)
+# Only statement containers can hold a def/class, so the walk never descends
+# into expressions, which are the bulk of the syntax tree.
+CONTAINER_TYPES = frozenset({
+    "module", "block", "decorated_definition", "function_definition", "class_definition",
+    "if_statement", "elif_clause", "else_clause", "for_statement", "while_statement",
+    "try_statement", "except_clause", "except_group_clause", "finally_clause",
+    "with_statement", "match_statement", "case_clause", "ERROR",
+})
 
 
-def get_function_and_class_chunks(code_source: str, filename: str = "unknown"):
+# Threads that parse in-process, shared by every load in the process
+PARSE_THREADS = int(os.environ.get("REPOROVER_PARSE_THREADS", "4"))
+
+# A Parser must never be used by two threads at once, so each thread has its own
+_thread_state = threading.local()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _new_parser() -> Parser:
+    try:
+        return Parser(PY_LANGUAGE)         # 0.23+ style
+    except TypeError:
+        parser = Parser()                  # fallback for older builds
+        parser.set_language(PY_LANGUAGE)
+        return parser
+
+
+def get_parser() -> Parser:
+    """This thread's parser, created on first use."""
+    parser = getattr(_thread_state, "parser", None)
+    if parser is None:
+        parser = _thread_state.parser = _new_parser()
+    return parser
+
+
+def get_parse_pool() -> ThreadPoolExecutor:
     """
-    Parses Python source code and returns LangChain Documents
-    for each function and top-level class found.
+    Process-wide pool of PARSE_THREADS threads for in-process parsing.
+    Concurrent loads share it, so parsing work stays bounded however many
+    sessions load at once.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, PARSE_THREADS), thread_name_prefix="reporover-parse")
+        return _pool
+
+# Pattern 0 matches calls (with the receiver of attribute calls), 1 and 2 imports
+REFERENCE_QUERY = PY_LANGUAGE.query("""
+(call function: [(identifier) @call
+                 (attribute object: (_) @receiver attribute: (identifier) @call)])
+(import_statement) @import
+(import_from_statement) @import
+""")
+
+# Receivers kept as text; anything else (calls, subscripts, literals) is unresolvable
+_NAME_TYPES = ("identifier", "attribute")
+
+
+class EntitySpan(NamedTuple):
+    """A function or class found in a file, addressed by byte range."""
+    name: str
+    kind: str          # tree-sitter node type, e.g. "function_definition"
+    start_byte: int
+    end_byte: int
+    start_line: int    # 0-based, as reported by tree-sitter
+    end_line: int
+    parent: int        # index of the enclosing span in the same list, -1 if top level
+
+
+class ImportRef(NamedTuple):
+    """One imported name: `import a.b as c` or `from a.b import d as c`."""
+    module: str        # dotted module, with leading dots for relative imports
+    name: str          # imported name for "from" imports, "" for plain imports
+    alias: str         # name bound in the importing file
+
+
+class CallRef(NamedTuple):
+    """A call site. foo() has receiver "", self.bar() "self", os.path.join() "os.path"."""
+    name: str
+    receiver: str      # "?" when the receiver is not a plain dotted name
+    caller: int        # index of the innermost enclosing span, -1 at module level
+
+
+class ParsedFile(NamedTuple):
+    spans: list[EntitySpan]
+    imports: list[ImportRef]
+    calls: list[CallRef]
+
+
+def parse_spans(code_source) -> list[EntitySpan]:
     """
-    tree = parser.parse(bytes(code_source, "utf8"))
-    chunks = []
+    Parse Python source (str or utf-8 bytes) and return one EntitySpan per
+    function/class definition, in document order. The source is encoded at
+    most once and names are decoded straight out of a memoryview.
+    """
+    data = code_source.encode("utf8") if isinstance(code_source, str) else code_source
+    return _walk_spans(get_parser().parse(data), memoryview(data))
+
+
+def parse_file(code_source) -> ParsedFile:
+    """parse_spans() plus the file's imports and call sites, from a single parse."""
+    data = code_source.encode("utf8") if isinstance(code_source, str) else code_source
+    view = memoryview(data)
+    tree = get_parser().parse(data)
+    spans = _walk_spans(tree, view)
+
+    def text(node):
+        return str(view[node.start_byte:node.end_byte], "utf8")
+
+    starts = [s.start_byte for s in spans]
+    imports = []
+    calls = []
+    for pattern, captures in REFERENCE_QUERY.matches(tree.root_node):
+        if pattern == 0:
+            node = captures["call"][0]
+            receiver = captures.get("receiver")
+            if receiver is None:
+                recv = ""
+            elif receiver[0].type in _NAME_TYPES:
+                recv = text(receiver[0])
+            else:
+                recv = "?"
+            # Innermost definition containing the call
+            pos = node.start_byte
+            i = bisect_right(starts, pos) - 1
+            while i >= 0 and spans[i].end_byte <= pos:
+                i = spans[i].parent
+            calls.append(CallRef(text(node), recv, i))
+        else:
+            imports.extend(_import_refs(captures["import"][0], text))
+    return ParsedFile(spans, imports, calls)
+
+
+def _import_refs(node, text) -> list[ImportRef]:
+    module = ""
+    if node.type == "import_from_statement":
+        module_node = node.child_by_field_name("module_name")
+        module = text(module_node) if module_node is not None else ""
+    refs = []
+    for child in node.children_by_field_name("name"):
+        if child.type == "aliased_import":
+            name = text(child.child_by_field_name("name"))
+            alias = text(child.child_by_field_name("alias"))
+        else:
+            name = text(child)
+            # `import a.b` binds `a`; `from m import x` binds `x`
+            alias = name if module else name.split(".")[0]
+        if module:
+            refs.append(ImportRef(module, name, alias))
+        else:
+            refs.append(ImportRef(name, "", alias))
+    return refs
+
+
+def _walk_spans(tree, view) -> list[EntitySpan]:
+    spans = []
+    open_spans = []  # (end_byte, index) of definitions enclosing the cursor
     cursor = tree.walk()
 
     while True:
         node = cursor.node
 
-        if node.type in ["function_definition", "class_definition"]:
+        if node.type in DEFINITION_TYPES:
             start = node.start_byte
-            end = node.end_byte
-            chunk_text = code_source.encode("utf8")[start:end].decode("utf8")
-
-            name = "unknown"
-            for child in node.children:
-                if child.type == "identifier":
-                    name = code_source.encode("utf8")[child.start_byte:child.end_byte].decode("utf8")
-                    break
-
-            chunks.append(Document(
-                page_content=chunk_text,
-                metadata={
-                    "type": node.type,
-                    "name": name,
-                    "start_line": node.start_point[0],
-                    "filename": filename,
-                }
-            ))
+            while open_spans and open_spans[-1][0] <= start:
+                open_spans.pop()
 
+            name_node = node.child_by_field_name("name")
+            if name_node is not None:
+                name = str(view[name_node.start_byte:name_node.end_byte], "utf8")
+            else:
+                name = "unknown"
 
-        if cursor.goto_first_child():
+            spans.append(EntitySpan(
+                name,
+                node.type,
+                start,
+                node.end_byte,
+                node.start_point[0],
+                node.end_point[0],
+                open_spans[-1][1] if open_spans else -1,
+            ))
+            open_spans.append((node.end_byte, len(spans) - 1))
+
+        if node.type in CONTAINER_TYPES and cursor.goto_first_child():
             continue
         if cursor.goto_next_sibling():
             continue
 
         while True:
             if not cursor.goto_parent():
-                return chunks
+                return spans
             if cursor.goto_next_sibling():
                 break
 
-    return chunks
+
+def get_function_and_class_chunks(code_source: str, filename: str = "unknown"):
+    """
+    Parses Python source code and returns LangChain Documents
+    for each function and top-level class found.
+    """
+    data = code_source.encode("utf8")
+    view = memoryview(data)
+    return [
+        Document(
+            page_content=str(view[s.start_byte:s.end_byte], "utf8"),
+            metadata={
+                "type": s.kind,
+                "name": s.name,
+                "start_line": s.start_line,
+                "filename": filename,
+            }
+        )
+        for s in parse_spans(data)
+    ]
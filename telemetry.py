@@ -0,0 +1,134 @@
+"""
+telemetry.py — Spans and counters for the load and answer paths.
+
+A Trace collects named durations (seconds, summed when a span repeats) and
+counters for one operation, and can append itself as a JSON line to a log
+file. With REPOROVER_TELEMETRY=0 every trace is the shared NULL_TRACE, whose
+methods do nothing.
+"""
+import json
+import os
+import threading
+import time
+
+TELEMETRY_ENABLED = os.environ.get("REPOROVER_TELEMETRY", "1") != "0"
+TELEMETRY_FILE = os.environ.get("REPOROVER_TELEMETRY_FILE")  # JSON lines sink; unset = no export
+
+_export_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "t0")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_time(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.timings = {}   # span name -> seconds
+        self.counters = {}  # counter name -> int
+
+    def span(self, name: str):
+        """Context manager timing the block into timings[name]."""
+        return _Span(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed_iter(self, iterable, name: str):
+        """Yield from `iterable`, adding the time spent producing items to timings[name]."""
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - t0)
+                return
+            self.add_time(name, time.perf_counter() - t0)
+            yield item
+
+    def to_dict(self) -> dict:
+        return {"trace": self.name, "ts": self.started, **self.attrs,
+                "timings": self.timings, "counters": self.counters}
+
+    def export(self, path=None):
+        """Append this trace as one JSON line to `path` (default REPOROVER_TELEMETRY_FILE)."""
+        path = path or TELEMETRY_FILE
+        if not path:
+            return
+        line = json.dumps(self.to_dict(), default=str) + "\n"
+        try:
+            with _export_lock, open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass  # telemetry must never fail the request
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTrace(Trace):
+    """Trace that records nothing; used when telemetry is disabled."""
+    enabled = False
+
+    def __init__(self):
+        self.name = "null"
+        self.started = time.time()
+
+    # NULL_TRACE is shared by every caller, and callers write to a trace's
+    # dicts (trace.attrs.update(...)), so each access gets a throwaway one
+    attrs = property(lambda self: {})
+    timings = property(lambda self: {})
+    counters = property(lambda self: {})
+
+    def span(self, name):
+        return _NULL_SPAN
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def timed_iter(self, iterable, name):
+        return iterable
+
+    def export(self, path=None):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+def start_trace(name: str, **attrs) -> Trace:
+    """A new Trace, or NULL_TRACE when telemetry is disabled."""
+    return Trace(name, **attrs) if TELEMETRY_ENABLED else NULL_TRACE